@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'supplyapp.timing_middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'supplyapp.force_middleware.ForceSameSiteMiddleware',
@@ -56,7 +57,7 @@ ROOT_URLCONF = 'Gourmet_coffee.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'supplyapp.timing_middleware.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'supplyapp', 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -122,7 +123,8 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
-STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
+# collectstatic target; must differ from STATICFILES_DIRS (staticfiles.E002)
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 # AWS CONFIGURATION
 AWS_REGION = 'us-east-1'
@@ -133,6 +135,91 @@ AWS_SNS_TOPIC_ARN = "arn:aws:sns:us-east-1:635277896149:CustomerNotifications"
 COGNITO_REGION = 'us-east-1'
 COGNITO_USER_POOL_ID = "us-east-1_oA1MZGWwS"
 COGNITO_CLIENT_ID = "4h4uc5p18rq6md979p1ebj86cb"
+# Signing keys for local JWT verification are refetched after this many seconds
+COGNITO_JWKS_TTL = 3600
+# Clock skew allowed when checking token expiry; tokens are refreshed this early
+COGNITO_TOKEN_LEEWAY = 60
 
 SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
+
+# Process-local reference data cache (seconds per DynamoDB table)
+REFERENCE_CACHE_TTLS = {
+    "Suppliers": 300,
+    "Distributors": 300,
+    "FinishedProducts": 60,
+}
+REFERENCE_CACHE_MAXSIZE = 1024
+
+# Invoice Lambda is invoked asynchronously from a bounded worker pool
+INVOICE_LAMBDA_NAME = "GenerateInvoiceLambda"
+INVOICE_DISPATCH_WORKERS = 4
+INVOICE_DISPATCH_MAX_PENDING = 100
+
+# Dashboard summary is flagged stale when not reconciled within this many seconds
+DASHBOARD_RECONCILE_MAX_AGE = 3600
+
+# Shared boto3 client pool (see supplyapp.aws)
+AWS_MAX_POOL_CONNECTIONS = 50
+AWS_CONNECT_TIMEOUT = 5
+AWS_READ_TIMEOUT = 10
+
+# GSI on DistributorInventory.distributor_id (created by provision_cloud)
+DISTRIBUTOR_INVENTORY_INDEX = "distributor_id-index"
+# GSI on FinishedProducts.blend_name (created by provision_cloud)
+FINISHED_PRODUCT_BLEND_INDEX = "blend_name-index"
+
+# Thread pool used to run independent DynamoDB reads in parallel
+FANOUT_MAX_WORKERS = 16
+FANOUT_TIMEOUT = 10
+
+# Parallel scan slices used for whole-table totals. Tables smaller than
+# SCAN_PARALLEL_MIN_ITEMS (DescribeTable ItemCount, cached for
+# SCAN_ITEM_COUNT_TTL seconds) are read with a single sequential scan,
+# which measured faster on small tables.
+SCAN_SEGMENTS = 4
+SCAN_PARALLEL_MIN_ITEMS = 100000
+SCAN_ITEM_COUNT_TTL = 3600
+SCAN_AGGREGATE_TIMEOUT = 120
+
+# Order form tokens are kept this long (seconds) before purge_idempotency_keys removes them
+IDEMPOTENCY_KEY_TTL = 86400
+
+# Per-request timing breakdown (Server-Timing header + /debug/timings/)
+REQUEST_TIMING_ENABLED = True
+REQUEST_TIMING_BUFFER_SIZE = 200
+# /debug/timings/ is for staff users only unless this is turned on
+REQUEST_TIMINGS_VIEW_PUBLIC = False
+
+# Pages that need a Cognito login: (path prefix, "*" or list of methods).
+# Compiled once into a regex per method by CognitoLoginRequiredMiddleware.
+LOGIN_PROTECTED_ROUTES = [
+    ("/customer/orders/new/", "*"),
+    ("/customer/orders/details/", "*"),
+]
+# Never checked, whatever the rules above say
+LOGIN_EXEMPT_PREFIXES = [STATIC_URL, "/favicon.ico"]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'supplyapp': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# Invoice listing on the inventory dashboard (supplyapp.invoices)
+INVOICE_PAGE_SIZE = 25
+INVOICE_MANIFEST_TTL = 300
+# Browser uploads go straight to S3 with a presigned POST; the bucket needs
+# a CORS rule allowing POST from the site's origin
+INVOICE_UPLOAD_MAX_BYTES = 100 * 1024 * 1024
+INVOICE_UPLOAD_EXPIRES = 600
+# Presigned invoice download links: signed for INVOICE_URL_EXPIRES seconds and
+# reused until INVOICE_URL_REFRESH_MARGIN seconds before they expire
+INVOICE_URL_EXPIRES = 3600
+INVOICE_URL_REFRESH_MARGIN = 600
+INVOICE_URL_CACHE_SIZE = 5000
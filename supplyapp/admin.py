@@ -3,9 +3,13 @@ from .models import (
     PurchaseOrderHistory,
     DistributorOrderHistory,
     CustomerOrderHistory,
+    NotificationOutbox,
+    IdempotencyKey,
 )
 
 admin.site.register(PurchaseOrderHistory)
 admin.site.register(DistributorOrderHistory)
 admin.site.register(CustomerOrderHistory)
+admin.site.register(NotificationOutbox)
+admin.site.register(IdempotencyKey)
 
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 
 class SupplychainConfig(AppConfig):
     name = 'supplyapp'
+
+    def ready(self):
+        from django.conf import settings
+
+        # Hook botocore before any module builds its clients, so every
+        # client is covered by RequestTimingMiddleware
+        if getattr(settings, "REQUEST_TIMING_ENABLED", True):
+            from .timing_middleware import install_hooks
+            install_hooks()
@@ -1,29 +1,130 @@
+import logging
+import re
+
+from django.conf import settings
 from django.shortcuts import redirect
 
+from .cognito_tokens import ensure_fresh_session
+
+
+logger = logging.getLogger(__name__)
+
+ALL_METHODS = "*"
+
+DEFAULT_PROTECTED_ROUTES = [
+    ("/customer/orders/new/", ALL_METHODS),
+    ("/customer/orders/details/", ALL_METHODS),
+]
+
+SESSION_TOKEN_KEYS = ("access_token", "id_token", "refresh_token", "token_expires_at")
+
+
+def _trie_pattern(prefixes):
+    """
+    A regex matching any of ``prefixes``, shaped like a character trie so
+    shared leading characters are compared once: a plain alternation
+    would retry every prefix in turn.
+    """
+    trie = {}
+    for prefix in prefixes:
+        node = trie
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def emit(node):
+        # A complete prefix matches whatever follows it
+        if "" in node:
+            return ""
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items())]
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return emit(trie)
+
+
+class ProtectedRoutes:
+    """
+    Path-prefix rules compiled into one regex per HTTP method.
+
+    ``rules`` is a list of ``(prefix, methods)`` where ``methods`` is
+    ``"*"`` or an iterable of method names. Matching a request is a dict
+    lookup and a single trie-shaped regex match, so its cost follows the
+    path length rather than the number of rules.
+    ``exempt`` prefixes (static files, favicon) are rejected before that
+    with one ``str.startswith``.
+    """
+
+    def __init__(self, rules, exempt=()):
+        self.exempt = tuple(p for p in exempt if p)
+        any_method = []
+        by_method = {}
+        for prefix, methods in rules:
+            if methods == ALL_METHODS:
+                any_method.append(prefix)
+            else:
+                for method in methods:
+                    by_method.setdefault(method.upper(), []).append(prefix)
+
+        self._any = self._compile(any_method)
+        self._by_method = {
+            method: self._compile(any_method + prefixes) for method, prefixes in by_method.items()
+        }
+
+    @staticmethod
+    def _compile(prefixes):
+        if not prefixes:
+            return None
+        return re.compile(_trie_pattern(prefixes))
+
+    @classmethod
+    def from_settings(cls):
+        exempt = getattr(settings, "LOGIN_EXEMPT_PREFIXES", None)
+        if exempt is None:
+            exempt = (settings.STATIC_URL, getattr(settings, "MEDIA_URL", None), "/favicon.ico")
+        return cls(getattr(settings, "LOGIN_PROTECTED_ROUTES", DEFAULT_PROTECTED_ROUTES), exempt)
+
+    def is_protected(self, method, path):
+        if self.exempt and path.startswith(self.exempt):
+            return False
+        pattern = self._by_method.get(method, self._any)
+        return pattern is not None and pattern.match(path) is not None
+
 
 class CognitoLoginRequiredMiddleware:
     """
-    Simple middleware to protect customer pages.
+    Protects customer pages listed in ``LOGIN_PROTECTED_ROUTES``.
 
-    If there is no access token in the session, redirect to login.
+    The session's access token is checked by expiry time only; once it has
+    expired it is refreshed with the stored refresh token. If there is no
+    usable token, redirect to login.
     """
 
     def __init__(self, get_response):
         self.get_response = get_response
+        self.routes = ProtectedRoutes.from_settings()
+        self._cognito = None
+
+    @property
+    def cognito(self):
+        # Created on first use: most requests never need to refresh
+        if self._cognito is None:
+            from .services import CognitoService
+            self._cognito = CognitoService()
+        return self._cognito
 
     def __call__(self, request):
-        # Add any paths you want to protect
-        protected_paths = [
-            "/customer/orders/new/",
-            "/customer/orders/details/",
-        ]
-
-        if any(request.path.startswith(p) for p in protected_paths):
-            if "access_token" not in request.session:
-                print("DEBUG MIDDLEWARE: NO ACCESS TOKEN FOUND")
-                print("DEBUG SESSION CONTENT:", request.session.items())
-                print("DEBUG REDIRECT PATH:", request.path)
+        if self.routes.is_protected(request.method, request.path):
+            if not ensure_fresh_session(request.session, self.cognito):
+                reason = "invalid" if "access_token" in request.session else "missing"
+                for key in SESSION_TOKEN_KEYS:
+                    request.session.pop(key, None)
+                logger.info(
+                    "login required method=%s path=%s reason=%s",
+                    request.method, request.path, reason,
+                    extra={"method": request.method, "path": request.path, "reason": reason},
+                )
                 return redirect("login")
 
-
         return self.get_response(request)
@@ -0,0 +1,134 @@
+import threading
+
+import boto3
+from botocore.config import Config
+from django.conf import settings
+
+
+def client_config():
+    """Shared botocore settings: a larger connection pool, TCP keep-alive and adaptive retries."""
+    return Config(
+        region_name=getattr(settings, "AWS_REGION", "us-east-1"),
+        max_pool_connections=getattr(settings, "AWS_MAX_POOL_CONNECTIONS", 50),
+        tcp_keepalive=True,
+        connect_timeout=getattr(settings, "AWS_CONNECT_TIMEOUT", 5),
+        read_timeout=getattr(settings, "AWS_READ_TIMEOUT", 10),
+        retries={"mode": "adaptive", "max_attempts": 5},
+    )
+
+
+class AWSClientRegistry:
+    """
+    Process-wide registry of boto3 clients, resources and table managers.
+
+    Clients are thread-safe, so one per (service, region) is shared by every
+    thread. Resources are not, so those (and the supplychainlib managers that
+    wrap a resource Table) are cached per thread. Either way a request never
+    pays for building a client or opening fresh connections.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._config = None
+        self._clients = {}
+        self._event_hooks = []
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        # boto3 sessions are not safe to create clients from concurrently
+        if self._session is None:
+            session = boto3.session.Session()
+            for event_name, handler in self._event_hooks:
+                session.events.register(event_name, handler)
+            self._config = client_config()
+            self._session = session
+        return self._session
+
+    def register_event_hooks(self, hooks):
+        """
+        Register botocore ``(event name, handler)`` hooks on every client
+        and resource this registry hands out, and only on those. New
+        clients inherit them from the registry's session; clients that
+        already exist get them through ``client.meta.events``.
+        """
+        with self._lock:
+            self._event_hooks.extend(hooks)
+            session = self._session
+            clients = [c for c in self._clients.values() if hasattr(c, "meta")]
+        for event_name, handler in hooks:
+            if session is not None:
+                session.events.register(event_name, handler)
+            for client in clients:
+                client.meta.events.register(event_name, handler)
+
+    def client(self, service_name, region_name=None):
+        key = (service_name, region_name)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self.session.client(
+                        service_name, region_name=region_name, config=self._config
+                    )
+                    self._clients[key] = client
+        return client
+
+    def resource(self, service_name, region_name=None):
+        resources = self._thread_cache("resources")
+        key = (service_name, region_name)
+        if key not in resources:
+            with self._lock:
+                resources[key] = self.session.resource(
+                    service_name, region_name=region_name, config=self._config
+                )
+        return resources[key]
+
+    def table(self, table_name, region_name=None):
+        return self.resource("dynamodb", region_name).Table(table_name)
+
+    def manager(self, manager_cls, *args):
+        """
+        A per-thread instance of a supplychainlib manager, e.g.
+        ``aws.manager(DistributorManager)``, bound to the pooled resource.
+        """
+        managers = self._thread_cache("managers")
+        key = (manager_cls,) + args
+        manager = managers.get(key)
+        if manager is None:
+            manager = manager_cls(*args)
+            manager.table = self.table(manager.table.name)
+            managers[key] = manager
+        return manager
+
+    def s3_manager(self, bucket_name):
+        """Shared S3Manager; the bucket existence check runs once per process, not per request."""
+        from supplychainlib.aws_s3 import S3Manager
+
+        key = ("s3_manager", bucket_name)
+        manager = self._clients.get(key)
+        if manager is None:
+            manager = S3Manager(bucket_name)
+            manager.s3_client = self.client("s3", manager.region_name)
+            with self._lock:
+                manager = self._clients.setdefault(key, manager)
+        return manager
+
+    def _thread_cache(self, name):
+        cache = getattr(self._local, name, None)
+        if cache is None:
+            cache = {}
+            setattr(self._local, name, cache)
+        return cache
+
+    def clear(self):
+        # Registered event hooks survive; the next session picks them up
+        with self._lock:
+            self._clients.clear()
+            self._session = None
+        self._local = threading.local()
+
+
+aws = AWSClientRegistry()
@@ -0,0 +1,450 @@
+"""
+Benchmark harness for supplyapp views.
+
+Seeds DynamoDB (normally moto) and the ORM with a configurable volume of
+data, then drives every GET-able URL in ``supplyapp.urls`` through the
+Django test client and reports latency percentiles and AWS call counts
+per view. Call counts come from ``RequestTimingMiddleware``, so that
+middleware must be enabled.
+
+Used by the ``benchmark_views`` management command and by the test suite.
+"""
+import datetime
+import math
+import statistics
+import time
+
+import boto3
+from django.conf import settings
+from django.test import Client
+from django.urls import URLPattern, reverse
+
+from .aws import aws
+from .cache import reference_cache
+from .models import PurchaseOrderHistory, DistributorOrderHistory, CustomerOrderHistory
+from .stores import iter_table
+from .timing_middleware import install_hooks, recent_timings
+
+
+DEFAULT_VOLUMES = {
+    "suppliers": 50,
+    "raw_materials": 50,
+    "finished_products": 20,
+    "distributors": 20,
+    "orders": 200,
+}
+
+# Views whose GET has side effects on the benchmark session (logout) or
+# that anonymous clients may not see (the staff-only timings view)
+SKIP_URL_NAMES = {"logout", "request_timings"}
+
+# Tables the app reads that provision_cloud does not create
+EXTRA_TABLES = {"PurchaseOrders": "po_id"}
+
+# Views whose benchmark request legitimately answers something other than 200
+EXPECTED_STATUS = {}
+
+BENCHMARK_USER = "benchmark@example.com"
+
+
+def provision():
+    """
+    Create every DynamoDB table (and GSI) plus the invoice bucket.
+
+    Call this right after starting moto: it drops cached clients so the
+    new ones talk to the stand-in and carry the timing hooks.
+    """
+    from .management.commands.provision_cloud import DynamoProvisioner
+
+    install_hooks()
+    aws.clear()
+
+    provisioner = DynamoProvisioner(settings.AWS_REGION)
+    provisioner.provision_all()
+    for name, key in EXTRA_TABLES.items():
+        if not provisioner.table_exists(name):
+            provisioner.create_table(name, key)
+    s3 = boto3.client("s3", region_name=settings.AWS_REGION)
+    s3.create_bucket(Bucket=settings.AWS_S3_BUCKET_NAME)
+
+
+def seed(volumes=None):
+    """Write ``volumes`` rows to DynamoDB and the order-history tables. Returns the ids used."""
+    volumes = {**DEFAULT_VOLUMES, **(volumes or {})}
+    ids = {
+        "suppliers": [f"SUP-{n:05d}" for n in range(volumes["suppliers"])],
+        "raw_materials": [f"RM-{n:05d}" for n in range(volumes["raw_materials"])],
+        "finished_products": [f"FP-{n:05d}" for n in range(volumes["finished_products"])],
+        "distributors": [f"DIST-{n:05d}" for n in range(volumes["distributors"])],
+    }
+    dynamodb = aws.resource("dynamodb")
+
+    def write(table_name, items):
+        with dynamodb.Table(table_name).batch_writer() as writer:
+            for item in items:
+                writer.put_item(Item=item)
+
+    write("Suppliers", ({
+        "id": sid, "name": f"Supplier {n}", "product": f"Bean {n}",
+        "price_per_unit": 3, "origin": "Colombia", "active": True,
+    } for n, sid in enumerate(ids["suppliers"])))
+    write("RawMaterials", ({
+        "id": rid, "name": f"Bean {n}", "supplier_id": ids["suppliers"][n % len(ids["suppliers"])],
+        "origin": "Colombia", "cost_per_pound": 3, "quantity": n % 50,
+    } for n, rid in enumerate(ids["raw_materials"])))
+    write("FinishedProducts", ({
+        "finished_id": fid, "blend_name": f"Blend {n}", "quantity": 100, "unit_price": 25,
+    } for n, fid in enumerate(ids["finished_products"])))
+    write("Recipes", ({
+        "blend_name": f"Blend {n}", "finished_id": fid, "raw_per_unit": 4, "unit_price": 25,
+    } for n, fid in enumerate(ids["finished_products"])))
+    write("Distributors", ({
+        "id": did, "name": f"Distributor {n}", "active": True,
+    } for n, did in enumerate(ids["distributors"])))
+    write("DistributorInventory", ({
+        "id": f"{did}#{fid}", "distributor_id": did, "product_id": fid, "quantity": 10,
+    } for did in ids["distributors"] for fid in ids["finished_products"][:5]))
+
+    today = datetime.date.today()
+    orders = volumes["orders"]
+    PurchaseOrderHistory.objects.bulk_create(
+        PurchaseOrderHistory(
+            order_id=f"PO-{n:06d}",
+            supplier_id=ids["suppliers"][n % len(ids["suppliers"])],
+            raw_material=ids["suppliers"][n % len(ids["suppliers"])],
+            raw_material_name=f"Bean {n}",
+            quantity=5,
+            status="Sent",
+            order_date=today - datetime.timedelta(days=n % 365),
+        )
+        for n in range(orders)
+    )
+    DistributorOrderHistory.objects.bulk_create(
+        DistributorOrderHistory(
+            order_id=f"DORD-{n:06d}",
+            distributor_id=ids["distributors"][n % len(ids["distributors"])],
+            product_id=ids["finished_products"][n % len(ids["finished_products"])],
+            quantity=2,
+            status="Processing",
+            order_date=today - datetime.timedelta(days=n % 365),
+        )
+        for n in range(orders)
+    )
+    CustomerOrderHistory.objects.bulk_create(
+        CustomerOrderHistory(
+            order_id=f"CORD-{n:06d}",
+            customer_name=BENCHMARK_USER,
+            distributor_id=ids["distributors"][n % len(ids["distributors"])],
+            product_id=ids["finished_products"][n % len(ids["finished_products"])],
+            quantity=1,
+            address="1 Main St",
+            status="Processing",
+            order_date=today - datetime.timedelta(days=n % 365),
+        )
+        for n in range(orders)
+    )
+    ids["orders"] = [f"CORD-{n:06d}" for n in range(orders)]
+    reference_cache.clear()
+    return ids
+
+
+def benchmark_urls(ids):
+    """(name, url) for every GET-able supplyapp URL, with path arguments filled from ``ids``."""
+    from . import urls
+
+    supplier = ids["suppliers"][0]
+    distributor = ids["distributors"][0]
+    product = ids["finished_products"][0]
+    kwargs_for = {
+        "supplier_id": supplier,
+        "distributor_id": distributor,
+        "shipment_id": ids["orders"][0] if ids["orders"] else "none",
+    }
+    query_for = {
+        "customer_order_form": f"?distributor={distributor}",
+        "get_product_details": f"?product_id={product}&distributor_id={distributor}",
+    }
+
+    seen = set()
+    found = []
+    for pattern in urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or pattern.name in SKIP_URL_NAMES:
+            continue
+        view_class = getattr(pattern.callback, "view_class", None)
+        if view_class is None or not hasattr(view_class, "get"):
+            continue
+        params = pattern.pattern.converters
+        if any(p not in kwargs_for for p in params):
+            continue
+        url = reverse(pattern.name, kwargs={p: kwargs_for[p] for p in params})
+        url += query_for.get(pattern.name, "")
+        if url not in seen:
+            seen.add(url)
+            found.append((pattern.name, url))
+    return found
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def run(ids, runs=20, warmup=1, client=None):
+    """
+    GET every benchmark URL ``warmup + runs`` times. Returns one result
+    dict per view with status, latency percentiles (ms) and per-request
+    AWS call counts from the last timed run.
+    """
+    client = client or Client()
+    session = client.session
+    session["access_token"] = "benchmark"
+    # Tracked expiry lets the login middleware skip token verification
+    session["token_expires_at"] = int(time.time()) + 24 * 3600
+    session["user_email"] = BENCHMARK_USER
+    session.save()
+
+    results = []
+    for name, url in benchmark_urls(ids):
+        samples = []
+        status = None
+        for attempt in range(warmup + runs):
+            start = time.perf_counter()
+            response = client.get(url)
+            elapsed = (time.perf_counter() - start) * 1000
+            status = response.status_code
+            if attempt >= warmup:
+                samples.append(elapsed)
+        timings = recent_timings.snapshot()[-1] if recent_timings.snapshot() else {}
+        services = timings.get("services", {})
+        results.append({
+            "view": name,
+            "url": url,
+            "status": status,
+            "p50_ms": round(statistics.median(samples), 2),
+            "p95_ms": round(percentile(samples, 95), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+            "dynamodb_calls": services.get("dynamodb", {}).get("count", 0),
+            "aws_calls": sum(s["count"] for s in services.values()),
+            "db_queries": timings.get("db", {}).get("count", 0),
+        })
+    return results
+
+
+def format_table(results):
+    header = (f"{'view':<32} {'status':>6} {'p50':>9} {'p95':>9} {'p99':>9} "
+              f"{'ddb':>5} {'aws':>5} {'sql':>5}")
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['view']:<32} {r['status']:>6} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+            f"{r['p99_ms']:>9.2f} {r['dynamodb_calls']:>5} {r['aws_calls']:>5} {r['db_queries']:>5}"
+        )
+    return "\n".join(lines)
+
+
+def check_budgets(results, max_p95_ms=None, max_dynamodb_calls=None):
+    """
+    Human-readable budget violations, empty if everything is within budget.
+    Every view must answer 200 unless ``EXPECTED_STATUS`` says otherwise:
+    a redirect or 404 is usually a view that skipped its real work.
+    """
+    problems = []
+    for r in results:
+        expected = EXPECTED_STATUS.get(r["view"], 200)
+        if r["status"] != expected:
+            problems.append(f"{r['view']} returned {r['status']}, expected {expected}")
+        if max_p95_ms is not None and r["p95_ms"] > max_p95_ms:
+            problems.append(f"{r['view']} p95 {r['p95_ms']} ms > {max_p95_ms} ms")
+        if max_dynamodb_calls is not None and r["dynamodb_calls"] > max_dynamodb_calls:
+            problems.append(
+                f"{r['view']} made {r['dynamodb_calls']} DynamoDB calls > {max_dynamodb_calls}"
+            )
+    return problems
+
+
+# ------------------------------------------------------------------
+# Focused scenarios, run by ``manage.py benchmark_scenario <name>``.
+# Each returns a list of result rows (dicts) for format_rows().
+# ------------------------------------------------------------------
+
+def inject_latency(ms, service="dynamodb"):
+    """
+    Sleep ``ms`` before every ``service`` call made through clients the
+    registry builds from now on. moto answers in-process, so without this
+    there is no I/O wait for concurrency to overlap.
+    """
+    delay = ms / 1000
+    aws.clear()
+    if delay:
+        aws.session.events.register(f"before-call.{service}", lambda **kwargs: time.sleep(delay))
+
+
+def create_seeded_table(name, key, items):
+    """Create a pay-per-request table keyed on ``key`` and batch-write ``items`` into it."""
+    table = aws.resource("dynamodb").create_table(
+        TableName=name,
+        KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    with table.batch_writer() as writer:
+        for item in items:
+            writer.put_item(Item=item)
+    return table
+
+
+def time_ms(fn, runs, before=None):
+    """Wall time of ``runs`` calls to ``fn`` in ms; ``before`` runs untimed ahead of each."""
+    samples = []
+    for _ in range(runs):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def time_each(fn, args):
+    """Wall time of ``fn(arg)`` for each of ``args``, in ms."""
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+
+def format_rows(rows):
+    if not rows:
+        return ""
+    columns = list(rows[0])
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    lines = [" ".join(f"{c:>{widths[c]}}" for c in columns)]
+    lines.append("-" * len(lines[0]))
+    for r in rows:
+        lines.append(" ".join(f"{str(r[c]):>{widths[c]}}" for c in columns))
+    return "\n".join(lines)
+
+
+def scenario_supplier_lookup(sizes=(100, 1000, 5000), lookups=20, batch=50):
+    """Scan + linear search vs. keyed get_item / BatchGetItem for supplier lookups."""
+    from supplychainlib.aws_dynamodb import DynamoDBManager, SupplierManager
+    from .services import SupplierLookupService
+
+    rows = []
+    for size in sizes:
+        aws.clear()
+        table = create_seeded_table("Suppliers", "id", ({
+            "id": f"SUP-{n:06d}", "name": f"Supplier {n}", "product": "Arabica",
+            "origin": "Colombia", "active": True,
+        } for n in range(size)))
+        ids = [f"SUP-{n:06d}" for n in range(0, size, max(1, size // lookups))][:lookups]
+        lookup = SupplierLookupService(aws.manager(SupplierManager))
+        scanner = aws.manager(DynamoDBManager, "Suppliers")
+
+        scan = time_each(lambda sid: next((s for s in scanner.scan_table() if s.get("id") == sid), None), ids)
+        get = time_each(lookup.get, ids)
+        batch_ids = [f"SUP-{n:06d}" for n in range(min(batch, size))]
+        batch_ms = time_ms(lambda: lookup.get_many(batch_ids), 1)[0]
+        rows.append({
+            "rows": size,
+            "scan_ms": round(statistics.median(scan), 2),
+            "get_ms": round(statistics.median(get), 2),
+            f"batch{len(batch_ids)}_ms": round(batch_ms, 2),
+        })
+        table.delete()
+    return rows
+
+
+def scenario_client_registry(requests=200):
+    """
+    Building managers and clients per request vs. reusing them from the
+    registry. Construction is local, so no AWS calls are made.
+    """
+    from supplychainlib.aws_dynamodb import (
+        DistributorManager, FinishedProductManager, DistributorInventoryManager,
+    )
+
+    region = settings.AWS_REGION
+
+    def per_request():
+        # What a typical view did before: fresh managers and clients
+        DistributorManager()
+        FinishedProductManager()
+        DistributorInventoryManager()
+        boto3.client("s3", region_name=region)
+        boto3.client("cognito-idp", region_name=settings.COGNITO_REGION)
+
+    def shared():
+        aws.manager(DistributorManager)
+        aws.manager(FinishedProductManager)
+        aws.manager(DistributorInventoryManager)
+        aws.client("s3")
+        aws.client("cognito-idp", settings.COGNITO_REGION)
+
+    rows = []
+    for name, fn in (("per-request", per_request), ("registry", shared)):
+        fn()  # warm-up: the first registry call builds the shared objects
+        rows.append({"strategy": name, **summarize(time_ms(fn, requests))})
+    return rows
+
+
+def scenario_fanout(rows=200, latency=20.0, runs=10):
+    """Sequential vs. fanned-out DynamoDB reads for the distributor inventory page."""
+    from supplychainlib.aws_dynamodb import DistributorInventoryManager
+    from .concurrency import gather
+
+    inject_latency(latency)
+    create_seeded_table("Distributors", "id", (
+        {"id": f"D{n}", "name": f"Distributor {n}", "active": True} for n in range(rows)
+    ))
+    create_seeded_table("FinishedProducts", "finished_id", (
+        {"finished_id": f"F{n}", "blend_name": f"Blend {n}"} for n in range(rows)
+    ))
+    create_seeded_table("DistributorInventory", "id", (
+        {"id": f"D{n}#F{n}", "distributor_id": f"D{n}", "product_id": f"F{n}", "quantity": n}
+        for n in range(rows)
+    ))
+
+    reads = (
+        lambda: reference_cache.names("Distributors"),
+        lambda: reference_cache.names("FinishedProducts"),
+        lambda: list(iter_table(aws.manager(DistributorInventoryManager).table)),
+    )
+    return [
+        {"strategy": name, **summarize(time_ms(load, runs, before=reference_cache.clear))}
+        for name, load in (
+            ("sequential", lambda: [read() for read in reads]),
+            ("fan-out", lambda: gather(*reads)),
+        )
+    ]
+
+
+def scenario_parallel_scan(rows=2000, segments=(1, 4, 8), page_size=100, latency=50.0, runs=5):
+    """A whole-table quantity total with different parallel scan segment counts."""
+    from .stores import sum_attribute
+
+    inject_latency(latency)
+    create_seeded_table("RawMaterials", "id", (
+        {"id": f"RM-{n:06d}", "name": f"Raw material {n}", "origin": "Colombia", "quantity": n % 100}
+        for n in range(rows)
+    ))
+    results = []
+    for count in segments:
+        totals = []
+        samples = time_ms(
+            lambda: totals.append(sum_attribute("RawMaterials", "quantity", count, page_size=page_size)),
+            runs,
+        )
+        results.append({"segments": count, **summarize(samples), "total": totals[-1]})
+    return results
@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from supplychainlib.aws_dynamodb import (
+    SupplierManager,
+    FinishedProductManager,
+    DistributorManager,
+)
+
+from .aws import aws
+from .stores import RecipeManager, batch_get_tables, iter_table
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    _MISSING = object()
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ReferenceDataCache:
+    """
+    Process-local cache for slowly changing reference tables
+    (suppliers, distributors, finished products, blend recipes).
+
+    Each table gets its own TTL. Write paths call ``invalidate`` so the
+    worker that made the change sees it immediately; other workers pick
+    it up once the TTL runs out.
+    """
+
+    ALL = "__all__"
+
+    # table name -> (key attribute, display-name attribute, manager factory)
+    TABLES = {
+        "Suppliers": ("id", "name", SupplierManager),
+        "Distributors": ("id", "name", DistributorManager),
+        "FinishedProducts": ("finished_id", "blend_name", FinishedProductManager),
+        "Recipes": ("blend_name", "blend_name", RecipeManager),
+    }
+
+    DEFAULT_TTL = 300
+    DEFAULT_MAXSIZE = 1024
+
+    def __init__(self, ttls=None, maxsize=None):
+        ttls = ttls if ttls is not None else getattr(settings, "REFERENCE_CACHE_TTLS", {})
+        maxsize = maxsize or getattr(settings, "REFERENCE_CACHE_MAXSIZE", self.DEFAULT_MAXSIZE)
+        self._caches = {
+            table: TTLCache(ttls.get(table, self.DEFAULT_TTL), maxsize)
+            for table in self.TABLES
+        }
+
+    def manager(self, table):
+        return aws.manager(self.TABLES[table][2])
+
+    def all(self, table):
+        """
+        Every item in ``table``, scanned at most once per TTL. A failed scan
+        raises and caches nothing.
+        """
+        cache = self._caches[table]
+        items = cache.get(self.ALL)
+        if items is None:
+            items = list(iter_table(self.manager(table).table))
+            cache.set(self.ALL, items)
+        return items
+
+    def names(self, table):
+        """{key: display name} map for ``table``."""
+        key_name, name_attr, _ = self.TABLES[table]
+        return {i.get(key_name): i.get(name_attr, "") for i in self.all(table)}
+
+    def get(self, table, key_value):
+        return self.get_many(table, [key_value]).get(key_value)
+
+    def get_many(self, table, key_values):
+        """
+        {key: item} for the requested keys. Hits come from the cache, misses
+        are read by key (BatchGetItem) rather than by scanning the table.
+        """
+        return self.resolve({table: key_values})[table]
+
+    def resolve(self, keys_by_table):
+        """
+        Look up keys in several tables at once, e.g.
+        ``resolve({"Distributors": [d_id], "FinishedProducts": [p_id]})``.
+
+        Returns {table: {key: item}}. Cached items are served from memory;
+        all misses, whatever their table, share one BatchGetItem round trip.
+        """
+        found, misses = {}, []
+        for table, key_values in keys_by_table.items():
+            cache = self._caches[table]
+            found[table] = {}
+            missing = []
+            for key_value in dict.fromkeys(k for k in key_values if k):
+                item = cache.get(key_value)
+                if item is None:
+                    missing.append(key_value)
+                else:
+                    found[table][key_value] = item
+            if missing:
+                misses.append((table, missing))
+
+        if misses:
+            fetched = batch_get_tables([
+                (self.manager(table), self.TABLES[table][0], missing)
+                for table, missing in misses
+            ])
+            for table, _ in misses:
+                items = fetched.get(self.manager(table).table.name, {})
+                for key_value, item in items.items():
+                    self._caches[table].set(key_value, item)
+                found[table].update(items)
+        return found
+
+    def invalidate(self, table, key_value=None):
+        """Drop the cached table listing, plus one item if ``key_value`` is given."""
+        cache = self._caches[table]
+        cache.invalidate(self.ALL)
+        if key_value is not None:
+            cache.invalidate(key_value)
+
+    def clear(self):
+        for cache in self._caches.values():
+            cache.invalidate()
+
+
+reference_cache = ReferenceDataCache()
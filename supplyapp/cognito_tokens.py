@@ -0,0 +1,184 @@
+import base64
+import json
+import threading
+import time
+import urllib.request
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicNumbers
+from django.conf import settings
+
+
+class InvalidToken(Exception):
+    """A Cognito JWT failed local verification."""
+
+
+class ExpiredToken(InvalidToken):
+    """The token is well formed and signed, but past its ``exp``."""
+
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def issuer():
+    return f"https://cognito-idp.{settings.COGNITO_REGION}.amazonaws.com/{settings.COGNITO_USER_POOL_ID}"
+
+
+class JWKSCache:
+    """
+    The user pool's signing keys, fetched once and kept for ``ttl`` seconds.
+
+    An unknown ``kid`` (Cognito rotated its keys) triggers one refetch, at
+    most every ``min_refresh`` seconds, so forged kids cannot hammer the
+    JWKS endpoint. A failed fetch backs off just as long and keeps
+    serving the keys already held.
+    """
+
+    def __init__(self, url=None, ttl=None, min_refresh=60, fetch=None):
+        self.url = url or getattr(settings, "COGNITO_JWKS_URL", None) or f"{issuer()}/.well-known/jwks.json"
+        self.ttl = ttl or getattr(settings, "COGNITO_JWKS_TTL", 3600)
+        self.min_refresh = min_refresh
+        self._fetch = fetch or self._fetch_url
+        self._keys = {}
+        self._fetched_at = None
+        self._attempted_at = None
+        self._lock = threading.Lock()
+
+    def _fetch_url(self):
+        with urllib.request.urlopen(self.url, timeout=5) as response:
+            return json.loads(response.read())
+
+    def _refresh(self):
+        document = self._fetch()
+        keys = {}
+        for jwk in document.get("keys", []):
+            if jwk.get("kty") != "RSA":
+                continue
+            numbers = RSAPublicNumbers(
+                e=int.from_bytes(_b64decode(jwk["e"]), "big"),
+                n=int.from_bytes(_b64decode(jwk["n"]), "big"),
+            )
+            keys[jwk["kid"]] = numbers.public_key()
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    def get(self, kid):
+        with self._lock:
+            now = time.monotonic()
+            due = self._attempted_at is None or now - self._attempted_at > self.min_refresh
+            stale = self._fetched_at is None or now - self._fetched_at > self.ttl
+            if due and (stale or kid not in self._keys):
+                # Recorded before fetching, so a failure also waits min_refresh
+                self._attempted_at = now
+                try:
+                    self._refresh()
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Error fetching Cognito JWKS: {e}")
+            return self._keys.get(kid)
+
+
+class TokenVerifier:
+    """Verifies Cognito access and id tokens without calling Cognito."""
+
+    def __init__(self, jwks=None, leeway=None):
+        self.jwks = jwks or JWKSCache()
+        self.leeway = leeway if leeway is not None else getattr(settings, "COGNITO_TOKEN_LEEWAY", 60)
+
+    def verify(self, token, token_use="access"):
+        """Return the token's claims, or raise InvalidToken / ExpiredToken."""
+        try:
+            header_b64, payload_b64, signature_b64 = token.split(".")
+            header = json.loads(_b64decode(header_b64))
+            claims = json.loads(_b64decode(payload_b64))
+            signature = _b64decode(signature_b64)
+        except (AttributeError, ValueError):
+            raise InvalidToken("Malformed token")
+
+        if header.get("alg") != "RS256":
+            raise InvalidToken("Unexpected signing algorithm")
+        key = self.jwks.get(header.get("kid"))
+        if key is None:
+            raise InvalidToken("Unknown signing key")
+        try:
+            key.verify(
+                signature,
+                f"{header_b64}.{payload_b64}".encode(),
+                padding.PKCS1v15(),
+                hashes.SHA256(),
+            )
+        except InvalidSignature:
+            raise InvalidToken("Bad signature")
+
+        if claims.get("iss") != issuer():
+            raise InvalidToken("Wrong issuer")
+        if claims.get("token_use") != token_use:
+            raise InvalidToken("Wrong token type")
+        # Access tokens carry client_id, id tokens carry aud
+        audience = claims.get("client_id") if token_use == "access" else claims.get("aud")
+        if audience != settings.COGNITO_CLIENT_ID:
+            raise InvalidToken("Token issued for another client")
+        if int(claims.get("exp", 0)) < time.time() - self.leeway:
+            raise ExpiredToken("Token expired")
+        return claims
+
+
+token_verifier = TokenVerifier()
+
+
+def store_tokens(session, tokens, email=None):
+    """
+    Verify freshly issued Cognito tokens and save them in the session with
+    their expiry, so later requests only need a clock comparison.
+    """
+    claims = token_verifier.verify(tokens["AccessToken"])
+    session["access_token"] = tokens["AccessToken"]
+    session["token_expires_at"] = int(claims["exp"])
+    if tokens.get("IdToken"):
+        session["id_token"] = tokens["IdToken"]
+    # Refresh responses do not include a new refresh token
+    if tokens.get("RefreshToken"):
+        session["refresh_token"] = tokens["RefreshToken"]
+    if email:
+        session["user_email"] = email
+    session.modified = True
+    return claims
+
+
+def ensure_fresh_session(session, cognito):
+    """
+    True if the session holds a usable access token, refreshing it with
+    the stored refresh token when it has expired. No remote call is made
+    while the token is still valid.
+    """
+    token = session.get("access_token")
+    if not token:
+        return False
+
+    expires_at = session.get("token_expires_at")
+    leeway = token_verifier.leeway
+    if expires_at is None:
+        # Sessions from before expiry tracking: verify once locally
+        try:
+            claims = token_verifier.verify(token)
+            session["token_expires_at"] = expires_at = int(claims["exp"])
+        except ExpiredToken:
+            expires_at = 0
+        except InvalidToken:
+            return False
+    if time.time() < expires_at - leeway:
+        return True
+
+    refresh_token = session.get("refresh_token")
+    if not refresh_token:
+        return False
+    result = cognito.refresh(refresh_token)
+    if "error" in result:
+        return False
+    try:
+        store_tokens(session, result["tokens"])
+    except InvalidToken:
+        return False
+    return True
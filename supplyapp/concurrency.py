@@ -0,0 +1,105 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.db import connections
+
+
+class FanOutTimeout(TimeoutError):
+    """A fanned-out call did not finish within its timeout."""
+
+
+_RAISE = object()
+
+
+class Call:
+    """
+    One unit of work for ``gather``: ``Call(fn, *args, timeout=2, default={})``.
+
+    ``timeout`` overrides the timeout given to ``gather``. If ``default`` is
+    set it is returned when the call times out, instead of raising.
+    """
+
+    def __init__(self, fn, *args, timeout=None, default=_RAISE, **kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.default = default
+
+    def __call__(self):
+        return self.fn(*self.args, **self.kwargs)
+
+    @property
+    def name(self):
+        return getattr(self.fn, "__qualname__", repr(self.fn))
+
+
+class FanOut:
+    """
+    Runs independent, I/O-bound calls (DynamoDB reads, mostly) on a shared
+    thread pool so a page waits for the slowest read rather than the sum.
+
+    Managers from ``aws.manager`` are per-thread, so calls running here get
+    their own boto3 resources. A call that times out is abandoned, not
+    cancelled: its thread finishes in the background.
+    """
+
+    def __init__(self, max_workers=None, default_timeout=None):
+        self.max_workers = max_workers or getattr(settings, "FANOUT_MAX_WORKERS", 16)
+        self.default_timeout = default_timeout or getattr(settings, "FANOUT_TIMEOUT", 10)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._local = threading.local()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="fan-out"
+                )
+            return self._executor
+
+    def gather(self, *calls, timeout=None):
+        """
+        Run ``calls`` (plain callables or ``Call``) concurrently and return
+        their results in order. Exceptions raised by a call propagate.
+        """
+        calls = [c if isinstance(c, Call) else Call(c) for c in calls]
+        if len(calls) < 2 or getattr(self._local, "worker", False):
+            # Nothing to overlap, or already on a pool thread: running
+            # inline avoids deadlocking a saturated pool.
+            return [c() for c in calls]
+
+        started = time.monotonic()
+        # Each call runs in a copy of the caller's context, so per-request
+        # state kept in context variables (e.g. request timings) follows it
+        futures = [
+            self.executor.submit(contextvars.copy_context().run, self._run, c) for c in calls
+        ]
+        results = []
+        for call, future in zip(calls, futures):
+            limit = call.timeout or timeout or self.default_timeout
+            try:
+                results.append(future.result(timeout=max(0, started + limit - time.monotonic())))
+            except FutureTimeout:
+                if call.default is _RAISE:
+                    raise FanOutTimeout(f"{call.name} did not finish within {limit}s")
+                print(f"{call.name} timed out after {limit}s, using default")
+                results.append(call.default)
+        return results
+
+    def _run(self, call):
+        self._local.worker = True
+        try:
+            return call()
+        finally:
+            # Any ORM use on a pool thread opens its own connection
+            connections.close_all()
+
+
+fan_out = FanOut()
+gather = fan_out.gather
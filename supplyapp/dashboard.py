@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from supplychainlib.aws_dynamodb import (
+    SupplierManager,
+    RawMaterialManager,
+    FinishedProductManager,
+    DistributorManager,
+)
+
+from .aws import aws
+from .concurrency import Call, gather
+from .stores import iter_table, sum_attribute
+from .models import (
+    DashboardSummary,
+    PurchaseOrderHistory,
+    DistributorOrderHistory,
+    CustomerOrderHistory,
+)
+
+
+COUNTERS = (
+    "supplier_count",
+    "po_count",
+    "inventory_count",
+    "finished_count",
+    "order_count",
+    "distributor_count",
+    "customer_order_count",
+)
+
+
+def record(**deltas):
+    """
+    Adjust dashboard counters in place, e.g. ``record(po_count=1)``.
+
+    Uses a single UPDATE ... SET n = n + delta, so concurrent writers do not
+    lose increments. If the summary row does not exist yet this is a no-op;
+    the first dashboard load reconciles it from source.
+    """
+    changes = {name: F(name) + int(delta) for name, delta in deltas.items() if delta}
+    if not changes:
+        return
+    unknown = set(changes) - set(COUNTERS)
+    if unknown:
+        raise ValueError(f"Unknown dashboard counters: {', '.join(sorted(unknown))}")
+    DashboardSummary.objects.filter(pk=DashboardSummary.SINGLETON_ID).update(
+        updated_at=timezone.now(), **changes
+    )
+
+
+def reconcile():
+    """
+    Recompute every counter from DynamoDB and the ORM, and store the result.
+
+    A failed or timed-out scan raises (``ClientError``/``BotoCoreError``/
+    ``FanOutTimeout``) and leaves the stored summary untouched.
+    """
+    # The four table scans are independent, so run them side by side.
+    # Only the attribute each counter needs is read.
+    def count(manager_cls):
+        return sum(1 for _ in iter_table(aws.manager(manager_cls).table, projection=["id"]))
+
+    def total_quantity(manager_cls):
+        return sum_attribute(aws.manager(manager_cls).table.name, "quantity")
+
+    supplier_count, inventory_count, finished_count, distributor_count = gather(
+        Call(count, SupplierManager),
+        Call(total_quantity, RawMaterialManager),
+        Call(total_quantity, FinishedProductManager),
+        Call(count, DistributorManager),
+        timeout=getattr(settings, "DASHBOARD_RECONCILE_TIMEOUT", 60),
+    )
+    values = {
+        "supplier_count": supplier_count,
+        "po_count": PurchaseOrderHistory.objects.count(),
+        "inventory_count": inventory_count,
+        "finished_count": finished_count,
+        "order_count": DistributorOrderHistory.objects.count(),
+        "distributor_count": distributor_count,
+        "customer_order_count": CustomerOrderHistory.objects.count(),
+    }
+    now = timezone.now()
+    summary, _ = DashboardSummary.objects.update_or_create(
+        pk=DashboardSummary.SINGLETON_ID,
+        defaults={**values, "updated_at": now, "reconciled_at": now},
+    )
+    return summary
+
+
+def get_summary():
+    """The materialized summary: one primary-key read, reconciled on first use."""
+    summary = DashboardSummary.objects.filter(pk=DashboardSummary.SINGLETON_ID).first()
+    return summary or reconcile()
+
+
+def is_stale(summary):
+    max_age = getattr(settings, "DASHBOARD_RECONCILE_MAX_AGE", 3600)
+    if summary.reconciled_at is None:
+        return True
+    return timezone.now() - summary.reconciled_at > timedelta(seconds=max_age)
@@ -0,0 +1,82 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+
+from .aws import aws
+from .cache import TTLCache
+
+
+class InvoiceDispatcher:
+    """
+    Fire-and-forget invoice generation for purchase orders.
+
+    Each PO is sent to the invoice Lambda once, as an asynchronous
+    ("Event") invocation, from a small bounded thread pool, so the HTTP
+    request never waits on Lambda. A PO id that was already dispatched
+    within ``dedupe_ttl`` seconds is ignored.
+    """
+
+    def __init__(self, function_name=None, max_workers=None, max_pending=None, dedupe_ttl=3600):
+        self.function_name = function_name or getattr(
+            settings, "INVOICE_LAMBDA_NAME", "GenerateInvoiceLambda"
+        )
+        self.max_workers = max_workers or getattr(settings, "INVOICE_DISPATCH_WORKERS", 4)
+        max_pending = max_pending or getattr(settings, "INVOICE_DISPATCH_MAX_PENDING", 100)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._seen = TTLCache(dedupe_ttl, maxsize=10000)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = aws.client("lambda")
+        return self._client
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="invoice-dispatch"
+                )
+            return self._executor
+
+    def dispatch(self, purchase_order):
+        """Queue invoice generation for ``purchase_order``. Returns False for a duplicate."""
+        po_id = purchase_order.get("po_id")
+        with self._lock:
+            if po_id:
+                if self._seen.get(po_id):
+                    return False
+                self._seen.set(po_id, True)
+
+        payload = json.dumps(purchase_order, default=str)
+        if self._slots.acquire(blocking=False):
+            future = self.executor.submit(self._invoke, po_id, payload)
+            future.add_done_callback(lambda _: self._slots.release())
+        else:
+            # Pool is saturated: an Event invoke only queues the work on
+            # the Lambda side, so doing it inline is still cheap.
+            self._invoke(po_id, payload)
+        return True
+
+    def _invoke(self, po_id, payload):
+        try:
+            self.client.invoke(
+                FunctionName=self.function_name,
+                InvocationType="Event",
+                Payload=payload,
+            )
+        except (ClientError, BotoCoreError) as e:
+            print(f"Invoice dispatch failed for PO {po_id}: {e}")
+            # Let a later retry of the same PO go through
+            if po_id:
+                self._seen.invalidate(po_id)
+
+
+invoice_dispatcher = InvoiceDispatcher()
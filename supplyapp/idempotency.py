@@ -0,0 +1,53 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+
+FORM_FIELD = "idempotency_key"
+
+
+def issue():
+    """A fresh token to embed in an order form."""
+    return uuid.uuid4().hex
+
+
+def run_once(key, scope, action):
+    """
+    Run ``action()`` (which returns the id of what it created) at most once
+    per ``key``. Returns ``(result_id, replayed)``.
+
+    The key row and everything ``action`` writes to the database share one
+    transaction: a concurrent duplicate waits on the unique index and then
+    replays, and a failed action releases the key so the user can retry.
+    Without a key the action simply runs.
+    """
+    if not key:
+        return action(), False
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(key=key[:64], scope=scope)
+        except IntegrityError:
+            existing = IdempotencyKey.objects.get(key=key[:64])
+            if existing.scope != scope:
+                raise ValueError("This form token was issued for a different form.")
+            return existing.result_id, True
+
+        result_id = action()
+        record.result_id = str(result_id or "")
+        record.save(update_fields=["result_id"])
+        return result_id, False
+
+
+def purge_expired():
+    """Delete keys older than IDEMPOTENCY_KEY_TTL seconds. Returns the count."""
+    ttl = getattr(settings, "IDEMPOTENCY_KEY_TTL", 86400)
+    cutoff = timezone.now() - timedelta(seconds=ttl)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
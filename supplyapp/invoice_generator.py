@@ -2,7 +2,7 @@
 import io
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
-from supplychainlib.aws_s3 import S3Manager
+from .aws import aws
 from django.conf import settings
 
 def generate_and_upload_invoice(purchase_order):
@@ -18,7 +18,7 @@ def generate_and_upload_invoice(purchase_order):
     pdf.save()
 
     buffer.seek(0)
-    s3 = S3Manager(settings.AWS_S3_BUCKET_NAME)
+    s3 = aws.s3_manager(settings.AWS_S3_BUCKET_NAME)
     s3_key = f"invoices/po_{purchase_order['id']}.pdf"
     s3.upload_fileobj(buffer, s3_key)
     return s3_key
@@ -0,0 +1,205 @@
+import bisect
+import os
+import re
+import threading
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from django.utils.timezone import now
+
+from .aws import aws
+from .cache import TTLCache
+
+
+class PresignedUrlCache:
+    """
+    Presigned ``get_object`` URLs for private invoice files.
+
+    Signing happens locally (no request to S3), but still goes through
+    botocore's request pipeline on every call. URLs are signed for
+    ``expires_in`` seconds and reused from a bounded LRU until
+    ``refresh_margin`` seconds before they expire, so a link handed out
+    from the cache is always valid for at least that long.
+    """
+
+    def __init__(self, bucket=None, expires_in=None, refresh_margin=None, maxsize=None):
+        self.bucket = bucket or settings.AWS_S3_BUCKET_NAME
+        # None means "use the setting"; 0 is a valid margin
+        if expires_in is None:
+            expires_in = getattr(settings, "INVOICE_URL_EXPIRES", 3600)
+        if refresh_margin is None:
+            refresh_margin = getattr(settings, "INVOICE_URL_REFRESH_MARGIN", 600)
+        if maxsize is None:
+            maxsize = getattr(settings, "INVOICE_URL_CACHE_SIZE", 5000)
+        self.expires_in = expires_in
+        self._urls = TTLCache(max(self.expires_in - refresh_margin, 0), maxsize)
+
+    def url(self, key):
+        url = self._urls.get(key)
+        if url is None:
+            url = aws.client("s3").generate_presigned_url(
+                "get_object",
+                Params={"Bucket": self.bucket, "Key": key},
+                ExpiresIn=self.expires_in,
+            )
+            self._urls.set(key, url)
+        return url
+
+    def invalidate(self, key=None):
+        self._urls.invalidate(key)
+
+
+presigned_urls = PresignedUrlCache()
+
+# upload_key() prepends "<YYYYmmdd_HHMMSS>_" to the uploaded file name
+_UPLOAD_TIMESTAMP = re.compile(r"^\d{8}_\d{6}_")
+
+
+class InvoiceCatalog:
+    """
+    Uploaded invoice files under ``prefix`` in the invoice bucket.
+
+    ``iter_objects`` streams keys page by page through the
+    ``list_objects_v2`` paginator, so there is no 1000-key ceiling and
+    nothing is held in memory. Page views are served from a manifest of
+    the whole prefix, built by one such listing and cached for
+    ``INVOICE_MANIFEST_TTL`` seconds; uploads and deletes invalidate it.
+    Download links are added per page from ``presigned_urls``, so the
+    manifest never holds a URL that may have expired. The manifest keeps
+    its keys in S3's sort order, so a page cursor is found by bisection.
+    """
+
+    def __init__(self, bucket=None, prefix="inventory/", ttl=None, page_size=None):
+        self.bucket = bucket or settings.AWS_S3_BUCKET_NAME
+        self.prefix = prefix
+        self.page_size = page_size or getattr(settings, "INVOICE_PAGE_SIZE", 25)
+        self._manifest = TTLCache(ttl or getattr(settings, "INVOICE_MANIFEST_TTL", 300), maxsize=1)
+        self._build_lock = threading.Lock()
+
+    def _entry(self, obj):
+        key = obj["Key"]
+        name = key.split("/")[-1]
+        return {
+            "name": name,                # just filename, for display
+            "original_name": _UPLOAD_TIMESTAMP.sub("", name),  # as uploaded, for filtering
+            "key": key,                  # full S3 object key, for download/delete
+            "size": obj.get("Size", 0),
+            "last_modified": obj.get("LastModified"),
+        }
+
+    def iter_objects(self, prefix=None, start_after=None, page_size=1000):
+        """Yield every invoice under ``prefix`` in key order, one S3 page at a time."""
+        prefix = prefix or self.prefix
+        params = {"Bucket": self.bucket, "Prefix": prefix}
+        if start_after:
+            params["StartAfter"] = start_after
+        paginator = aws.client("s3").get_paginator("list_objects_v2")
+        for page in paginator.paginate(**params, PaginationConfig={"PageSize": page_size}):
+            for obj in page.get("Contents", []):
+                if obj["Key"] != prefix:  # Avoid directory entry
+                    yield self._entry(obj)
+
+    def manifest(self):
+        """Every invoice under the catalog prefix, listed at most once per TTL."""
+        return self._listing()[0]
+
+    def _listing(self):
+        # (entries, their keys): the keys are kept for bisecting cursors
+        listing = self._manifest.get(self.prefix)
+        if listing is not None:
+            return listing
+        with self._build_lock:
+            # Another request may have built it while we waited
+            listing = self._manifest.get(self.prefix)
+            if listing is None:
+                entries = list(self.iter_objects())
+                listing = (entries, [e["key"] for e in entries])
+                self._manifest.set(self.prefix, listing)
+        return listing
+
+    def invalidate(self):
+        self._manifest.invalidate()
+
+    # ------------------------------------------------------------------
+    # Direct-to-S3 uploads: the browser POSTs the file to S3 itself and
+    # Django only signs the request and registers the result.
+    # ------------------------------------------------------------------
+
+    def upload_key(self, filename):
+        timestamp = now().strftime("%Y%m%d_%H%M%S")
+        return f"{self.prefix}{timestamp}_{os.path.basename(filename)}"
+
+    def presigned_upload(self, filename):
+        """
+        A presigned POST (``{"url", "fields", "key"}``) that lets the
+        browser upload one file of at most ``INVOICE_UPLOAD_MAX_BYTES``
+        straight to a fresh key under the catalog prefix.
+        """
+        key = self.upload_key(filename)
+        post = aws.client("s3").generate_presigned_post(
+            Bucket=self.bucket,
+            Key=key,
+            Conditions=[
+                ["content-length-range", 1, getattr(settings, "INVOICE_UPLOAD_MAX_BYTES", 100 * 1024 * 1024)],
+            ],
+            ExpiresIn=getattr(settings, "INVOICE_UPLOAD_EXPIRES", 600),
+        )
+        return {"url": post["url"], "fields": post["fields"], "key": key}
+
+    def register_upload(self, key):
+        """
+        Called once the browser reports a finished upload. Returns the
+        catalog entry, or None if ``key`` is not an uploaded invoice.
+        """
+        if not key or not key.startswith(self.prefix) or key == self.prefix:
+            return None
+        try:
+            head = aws.client("s3").head_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return None
+        self.invalidate()
+        return self._entry({
+            "Key": key, "Size": head.get("ContentLength", 0), "LastModified": head.get("LastModified"),
+        })
+
+    def page(self, cursor=None, prefix=None, since=None, until=None, page_size=None):
+        """
+        One page of invoices and the cursor for the next page (None on the
+        last one). ``cursor`` is the last key of the previous page;
+        ``prefix`` is matched, case-insensitively, against the file name as
+        uploaded (without the timestamp ``upload_key`` adds) or as stored;
+        ``since``/``until`` are dates compared with the upload time.
+        """
+        page_size = page_size or self.page_size
+        try:
+            entries, keys = self._listing()
+        except (ClientError, BotoCoreError) as e:
+            print(f"S3 list error: {e}")
+            return [], None
+
+        prefix = (prefix or "").lower()
+        start = bisect.bisect_right(keys, cursor) if cursor else 0
+        items = []
+        for index in range(start, len(entries)):
+            entry = entries[index]
+            if prefix and not (
+                entry["original_name"].lower().startswith(prefix) or entry["name"].lower().startswith(prefix)
+            ):
+                continue
+            modified = entry["last_modified"]
+            if modified is not None:
+                if since and modified.date() < since:
+                    continue
+                if until and modified.date() > until:
+                    continue
+            if len(items) == page_size:
+                return self._with_urls(items), items[-1]["key"]
+            items.append(entry)
+        return self._with_urls(items), None
+
+    @staticmethod
+    def _with_urls(entries):
+        return [{**entry, "url": presigned_urls.url(entry["key"])} for entry in entries]
+
+
+invoice_catalog = InvoiceCatalog()
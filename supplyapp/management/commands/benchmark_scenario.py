@@ -0,0 +1,79 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from supplyapp import benchmark
+
+
+def _ints(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Run one focused benchmark scenario against an in-memory DynamoDB "
+        "(moto) and print a result table. See `benchmark_scenario <name> -h`."
+    )
+    # Scenarios build managers and clients only once moto is running
+    requires_system_checks = False
+
+    # name -> (function, needs moto)
+    scenarios = {
+        "supplier-lookup": (benchmark.scenario_supplier_lookup, True),
+        "client-registry": (benchmark.scenario_client_registry, False),
+        "fanout": (benchmark.scenario_fanout, True),
+        "parallel-scan": (benchmark.scenario_parallel_scan, True),
+    }
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest="scenario", metavar="scenario")
+        subparsers.required = True
+
+        lookup = subparsers.add_parser("supplier-lookup", help="Scan vs. keyed supplier lookups.")
+        lookup.add_argument("--sizes", type=_ints, default=[100, 1000, 5000],
+                            help="Comma separated Suppliers table sizes to seed.")
+        lookup.add_argument("--lookups", type=int, default=20, help="Lookups timed per table size.")
+        lookup.add_argument("--batch", type=int, default=50, help="Ids fetched per get_many call.")
+
+        registry = subparsers.add_parser("client-registry", help="Per-request vs. shared AWS clients.")
+        registry.add_argument("--requests", type=int, default=200, help="Simulated requests per strategy.")
+
+        fanout = subparsers.add_parser("fanout", help="Sequential vs. fanned-out page reads.")
+        fanout.add_argument("--rows", type=int, default=200, help="Rows seeded into each table.")
+        fanout.add_argument("--latency", type=float, default=20.0,
+                            help="Simulated network latency per DynamoDB call, in ms.")
+        fanout.add_argument("--runs", type=int, default=10, help="Page loads timed per strategy.")
+
+        scan = subparsers.add_parser("parallel-scan", help="Whole-table totals by scan segment count.")
+        scan.add_argument("--rows", type=int, default=2000, help="Rows seeded into RawMaterials.")
+        scan.add_argument("--segments", type=_ints, default=[1, 4, 8],
+                          help="Comma separated segment counts to compare.")
+        scan.add_argument("--page-size", type=int, default=100, help="Scan Limit, i.e. rows per page.")
+        scan.add_argument("--latency", type=float, default=50.0,
+                          help="Simulated network latency per DynamoDB call, in ms.")
+        scan.add_argument("--runs", type=int, default=5, help="Totals timed per segment count.")
+
+    def handle(self, *args, **options):
+        name = options["scenario"]
+        fn, needs_moto = self.scenarios[name]
+        kwargs = {
+            key: options[key] for key in fn.__code__.co_varnames[:fn.__code__.co_argcount]
+            if key in options
+        }
+
+        # Clients need some credentials to exist, even when moto answers
+        for var in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+            os.environ.setdefault(var, "testing")
+        if not needs_moto:
+            rows = fn(**kwargs)
+        else:
+            try:
+                from moto import mock_aws
+            except ImportError:
+                raise CommandError("moto is required for this benchmark: pip install moto")
+            with mock_aws():
+                try:
+                    rows = fn(**kwargs)
+                finally:
+                    benchmark.aws.clear()
+        self.stdout.write(benchmark.format_rows(rows))
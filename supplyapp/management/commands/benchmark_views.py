@@ -0,0 +1,65 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.test.runner import DiscoverRunner
+
+from supplyapp import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed moto and a throwaway test database, GET every supplyapp URL and "
+        "report p50/p95/p99 latency and AWS call counts per view (requires moto). "
+        "Exits non-zero when a budget is exceeded, so it can gate CI."
+    )
+    # The URL checks would import the views, whose module-level managers
+    # must only be built once moto is running.
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        for name, default in benchmark.DEFAULT_VOLUMES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default,
+                                help=f"Number of {name.replace('_', ' ')} to seed.")
+        parser.add_argument("--runs", type=int, default=20,
+                            help="Timed requests per URL (after one warm-up request).")
+        parser.add_argument("--max-p95-ms", type=float, default=None,
+                            help="Fail if any view's p95 latency exceeds this.")
+        parser.add_argument("--max-dynamodb-calls", type=int, default=None,
+                            help="Fail if any view makes more DynamoDB calls per request.")
+        parser.add_argument("--json", dest="json_path", default=None,
+                            help="Also write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        try:
+            from moto import mock_aws
+        except ImportError:
+            raise CommandError("moto is required for this benchmark: pip install moto")
+
+        for var in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+            os.environ.setdefault(var, "testing")
+        volumes = {name: options[name] for name in benchmark.DEFAULT_VOLUMES}
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            with mock_aws():
+                benchmark.provision()
+                ids = benchmark.seed(volumes)
+                results = benchmark.run(ids, runs=options["runs"])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        self.stdout.write(benchmark.format_table(results))
+        if options["json_path"]:
+            with open(options["json_path"], "w") as fh:
+                json.dump({"volumes": volumes, "results": results}, fh, indent=2)
+
+        problems = benchmark.check_budgets(
+            results, options["max_p95_ms"], options["max_dynamodb_calls"]
+        )
+        if problems:
+            raise CommandError("Benchmark budget exceeded:\n  " + "\n  ".join(problems))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from supplyapp.outbox import OutboxDrainer
+
+
+class Command(BaseCommand):
+    help = "Publish pending SNS notifications from the outbox table in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep draining instead of exiting after one pass.")
+        parser.add_argument("--interval", type=float, default=2.0,
+                            help="Seconds to sleep when the outbox is empty (with --loop).")
+        parser.add_argument("--batch", type=int, default=100,
+                            help="Maximum rows claimed per pass.")
+        parser.add_argument("--max-attempts", type=int, default=5,
+                            help="Publish attempts before a row is marked failed.")
+
+    def handle(self, *args, **options):
+        drainer = OutboxDrainer(batch_limit=options["batch"], max_attempts=options["max_attempts"])
+        while True:
+            sent, failed = drainer.drain()
+            if sent or failed:
+                self.stdout.write(f"Outbox: {sent} sent, {failed} failed")
+            if not options["loop"]:
+                break
+            # A full batch means there may be more waiting
+            if sent + failed < options["batch"]:
+                time.sleep(options["interval"])
@@ -1,7 +1,21 @@
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
 import boto3
+from boto3.dynamodb.conditions import Attr
 from botocore.exceptions import ClientError
 
+from supplyapp.stores import iter_table
+
+
+# Recipes written on first provisioning: raw units per finished unit and price
+DEFAULT_RECIPES = {
+    "Roasted Beans": {"raw_per_unit": 4, "unit_price": Decimal("25.0")},
+    "Espresso Blend": {"raw_per_unit": 4, "unit_price": Decimal("30.0")},
+}
+
 
 class DynamoProvisioner:
     """Creates required DynamoDB tables automatically if they do not exist."""
@@ -18,14 +32,24 @@ class DynamoProvisioner:
             print(f"Error listing tables: {e}")
             return False
 
-    def create_table(self, name, key_name):
+    def create_table(self, name, key_name, indexes=None):
         """Create a DynamoDB table with PAY_PER_REQUEST billing."""
+        indexes = indexes or {}
+        attributes = {key_name, *indexes.values()}
+        kwargs = {}
+        if indexes:
+            kwargs["GlobalSecondaryIndexes"] = [
+                self.index_definition(index_name, attr) for index_name, attr in indexes.items()
+            ]
         try:
             self.dynamodb.create_table(
                 TableName=name,
                 KeySchema=[{"AttributeName": key_name, "KeyType": "HASH"}],
-                AttributeDefinitions=[{"AttributeName": key_name, "AttributeType": "S"}],
-                BillingMode="PAY_PER_REQUEST"
+                AttributeDefinitions=[
+                    {"AttributeName": attr, "AttributeType": "S"} for attr in sorted(attributes)
+                ],
+                BillingMode="PAY_PER_REQUEST",
+                **kwargs
             )
             print(f"Table '{name}' created successfully.")
         except ClientError as e:
@@ -34,6 +58,38 @@ class DynamoProvisioner:
             else:
                 print(f"Error creating table {name}: {e}")
 
+    @staticmethod
+    def index_definition(index_name, attribute):
+        return {
+            "IndexName": index_name,
+            "KeySchema": [{"AttributeName": attribute, "KeyType": "HASH"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }
+
+    def ensure_indexes(self, name, indexes):
+        """Add any missing global secondary indexes to an existing table."""
+        try:
+            table = self.dynamodb.describe_table(TableName=name)["Table"]
+        except ClientError as e:
+            print(f"Error describing table {name}: {e}")
+            return
+        existing = {i["IndexName"] for i in table.get("GlobalSecondaryIndexes", [])}
+        for index_name, attribute in indexes.items():
+            if index_name in existing:
+                continue
+            # DynamoDB allows one index creation per UpdateTable call
+            try:
+                self.dynamodb.update_table(
+                    TableName=name,
+                    AttributeDefinitions=[{"AttributeName": attribute, "AttributeType": "S"}],
+                    GlobalSecondaryIndexUpdates=[
+                        {"Create": self.index_definition(index_name, attribute)}
+                    ],
+                )
+                print(f"Index '{index_name}' is being created on '{name}'.")
+            except ClientError as e:
+                print(f"Error creating index {index_name} on {name}: {e}")
+
     def provision_all(self):
         """Create all required tables for the Gourmet Coffee system."""
         tables = {
@@ -44,14 +100,94 @@ class DynamoProvisioner:
             "DistributorOrders": "order_id",
             "DistributorInventory": "id",
             "CustomerOrders": "order_id",
+            "Recipes": "blend_name",
+        }
+        # Global secondary indexes per table: {index name: partition key}
+        indexes = {
+            "DistributorInventory": {
+                getattr(settings, "DISTRIBUTOR_INVENTORY_INDEX", "distributor_id-index"): "distributor_id",
+            },
+            "FinishedProducts": {
+                getattr(settings, "FINISHED_PRODUCT_BLEND_INDEX", "blend_name-index"): "blend_name",
+            },
         }
 
         for name, key in tables.items():
             if not self.table_exists(name):
                 print(f"Creating DynamoDB table: {name}")
-                self.create_table(name, key)
+                self.create_table(name, key, indexes.get(name))
             else:
                 print(f"Table '{name}' already exists, skipping.")
+                if name in indexes:
+                    self.ensure_indexes(name, indexes[name])
+
+        self.seed_recipes()
+        self.backfill_distributor_inventory()
+
+    def backfill_distributor_inventory(self):
+        """
+        Older DistributorInventory rows only carry the composite
+        ``id`` ("<distributor_id>#<product_id>"), so the sparse
+        ``distributor_id`` index never sees them. Copy both halves of the
+        key onto every such row. Returns the number of rows updated.
+        """
+        table = boto3.resource('dynamodb', region_name=self.region).Table("DistributorInventory")
+        self.dynamodb.get_waiter('table_exists').wait(TableName="DistributorInventory")
+        updated = 0
+        try:
+            for item in iter_table(table, projection=["id"], filter=Attr("distributor_id").not_exists()):
+                distributor_id, sep, product_id = item["id"].partition("#")
+                if not sep or not distributor_id or not product_id:
+                    print(f"Skipping DistributorInventory item with unexpected id: {item['id']}")
+                    continue
+                try:
+                    table.update_item(
+                        Key={"id": item["id"]},
+                        UpdateExpression="SET distributor_id = :d, product_id = :p",
+                        ConditionExpression="attribute_exists(id) AND attribute_not_exists(distributor_id)",
+                        ExpressionAttributeValues={":d": distributor_id, ":p": product_id},
+                    )
+                    updated += 1
+                except ClientError as e:
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        print(f"Error backfilling {item['id']}: {e}")
+        except ClientError as e:
+            print(f"Error scanning DistributorInventory for backfill: {e}")
+        if updated:
+            print(f"Backfilled distributor_id/product_id on {updated} DistributorInventory items.")
+        return updated
+
+    def seed_recipes(self, recipes=None):
+        """
+        Add any missing default recipe. A blend that already has a finished
+        product keeps its ``finished_id``; otherwise a new one is assigned.
+        """
+        resource = boto3.resource('dynamodb', region_name=self.region)
+        waiter = self.dynamodb.get_waiter('table_exists')
+        waiter.wait(TableName="Recipes")
+        waiter.wait(TableName="FinishedProducts")
+        recipes_table = resource.Table("Recipes")
+        existing = {}
+        try:
+            for item in iter_table(resource.Table("FinishedProducts"), projection=["finished_id", "blend_name"]):
+                existing.setdefault(item.get("blend_name"), item["finished_id"])
+        except ClientError as e:
+            # Without the full list a recipe could get a second finished_id
+            print(f"Error reading finished products, recipes not seeded: {e}")
+            return
+
+        for blend_name, recipe in (recipes or DEFAULT_RECIPES).items():
+            item = {
+                "blend_name": blend_name,
+                "finished_id": existing.get(blend_name) or str(uuid.uuid4()),
+                **recipe,
+            }
+            try:
+                recipes_table.put_item(Item=item, ConditionExpression=Attr("blend_name").not_exists())
+                print(f"Recipe '{blend_name}' added.")
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    print(f"Error adding recipe {blend_name}: {e}")
 
 
 class Command(BaseCommand):
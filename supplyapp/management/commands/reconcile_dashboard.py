@@ -0,0 +1,17 @@
+from botocore.exceptions import BotoCoreError, ClientError
+from django.core.management.base import BaseCommand, CommandError
+
+from supplyapp import dashboard
+from supplyapp.concurrency import FanOutTimeout
+
+
+class Command(BaseCommand):
+    help = "Recompute the materialized dashboard summary from DynamoDB and the ORM."
+
+    def handle(self, *args, **options):
+        try:
+            summary = dashboard.reconcile()
+        except (ClientError, BotoCoreError, FanOutTimeout) as e:
+            raise CommandError(f"Reconcile failed, summary left unchanged: {e}")
+        counts = ", ".join(f"{name}={getattr(summary, name)}" for name in dashboard.COUNTERS)
+        self.stdout.write(f"Dashboard summary reconciled: {counts}")
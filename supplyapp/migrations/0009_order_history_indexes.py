@@ -0,0 +1,45 @@
+# Generated by Django 2.1.15 on 2026-10-18 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supplyapp', '0008_auto_20251116_0937'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerorderhistory',
+            index=models.Index(fields=['customer_name', '-order_date'], name='cust_hist_customer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerorderhistory',
+            index=models.Index(fields=['order_date', 'order_id'], name='cust_hist_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerorderhistory',
+            index=models.Index(fields=['distributor_id', 'status'], name='cust_hist_dist_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='distributororderhistory',
+            index=models.Index(fields=['order_date', 'order_id'], name='dist_hist_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='distributororderhistory',
+            index=models.Index(fields=['distributor_id', 'status'], name='dist_hist_dist_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorderhistory',
+            index=models.Index(fields=['order_date', 'order_id'], name='po_hist_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorderhistory',
+            index=models.Index(fields=['supplier_id', 'order_date'], name='po_hist_supplier_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorderhistory',
+            index=models.Index(fields=['raw_material'], name='po_hist_material_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.1.15 on 2026-10-18 04:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supplyapp', '0010_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('supplier_count', models.IntegerField(default=0)),
+                ('po_count', models.IntegerField(default=0)),
+                ('inventory_count', models.IntegerField(default=0)),
+                ('finished_count', models.IntegerField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('distributor_count', models.IntegerField(default=0)),
+                ('customer_order_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
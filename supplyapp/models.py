@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from supplychainlib.aws_dynamodb import DistributorInventoryManager
 
 class PurchaseOrderHistory(models.Model):
@@ -10,6 +11,14 @@ class PurchaseOrderHistory(models.Model):
     status = models.CharField(max_length=50)
     order_date = models.DateField()
     delivery_date = models.CharField(max_length=100, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["order_date", "order_id"], name="po_hist_date_idx"),
+            models.Index(fields=["supplier_id", "order_date"], name="po_hist_supplier_date_idx"),
+            models.Index(fields=["raw_material"], name="po_hist_material_idx"),
+        ]
+
     def __str__(self):
         return f"PO {self.order_id} - {self.status}"
 
@@ -22,6 +31,12 @@ class DistributorOrderHistory(models.Model):
     status = models.CharField(max_length=50)
     order_date = models.DateField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["order_date", "order_id"], name="dist_hist_date_idx"),
+            models.Index(fields=["distributor_id", "status"], name="dist_hist_dist_status_idx"),
+        ]
+
     def __str__(self):
         return f"Distributor Order {self.order_id} - {self.status}"
 
@@ -38,47 +53,113 @@ class CustomerOrderHistory(models.Model):
     status = models.CharField(max_length=50)
     tracking_link = models.CharField(max_length=255, blank=True, null=True)
     order_date = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["customer_name", "-order_date"], name="cust_hist_customer_date_idx"),
+            models.Index(fields=["order_date", "order_id"], name="cust_hist_date_idx"),
+            models.Index(fields=["distributor_id", "status"], name="cust_hist_dist_status_idx"),
+        ]
     
     def update_status_and_inventory(self, new_status):
+        from .aws import aws
+        from .services import InventoryLedger
+
         previous_status = self.status
-        self.status = new_status
-        self.save()
+        ledger = InventoryLedger(aws.manager(DistributorInventoryManager))
+        inv_id = f"{self.distributor_id}#{self.product_id}"
+        quantity = int(self.quantity)
 
-        # Inventory update logic
+        # Inventory first: a rejected decrement leaves the status unchanged
         if previous_status != "Delivered" and new_status == "Delivered":
-            distributor_id = self.distributor_id
-            product_id = self.product_id
-            quantity = int(self.quantity)
-            inventory_manager = DistributorInventoryManager()
-            inv_id = f"{distributor_id}#{product_id}"
-            key = {"id": inv_id}
-            existing = inventory_manager.get_item(key)
-            if existing and existing.get("quantity") is not None:
-                current_qty = int(existing["quantity"])
-                updated_qty = max(0, current_qty - quantity)
-                inventory_manager.update_item(
-                    key=key,
-                    update_expr="SET quantity = :q",
-                    values={":q": updated_qty}
-                )
+            ledger.remove(inv_id, quantity)
         elif previous_status == "Delivered" and new_status != "Delivered":
-            # Optional: Restore inventory if moving away from "Delivered"
-            distributor_id = self.distributor_id
-            product_id = self.product_id
-            quantity = int(self.quantity)
-            inventory_manager = DistributorInventoryManager()
-            inv_id = f"{distributor_id}#{product_id}"
-            key = {"id": inv_id}
-            existing = inventory_manager.get_item(key)
-            if existing and existing.get("quantity") is not None:
-                current_qty = int(existing["quantity"])
-                updated_qty = current_qty + quantity
-                inventory_manager.update_item(
-                    key=key,
-                    update_expr="SET quantity = :q",
-                    values={":q": updated_qty}
-                )
+            # Restore inventory if moving away from "Delivered"
+            ledger.add(inv_id, quantity, {
+                "distributor_id": self.distributor_id,
+                "product_id": self.product_id,
+            })
+
+        self.status = new_status
+        self.save()
     
     def __str__(self):
         return f"{self.customer_name} - {self.product_name} x {self.quantity}"
 
+
+
+class NotificationOutbox(models.Model):
+    """
+    SNS messages waiting to be published.
+
+    Rows are written in the same DB transaction as the change they describe
+    and published later by the ``drain_outbox`` management command.
+    """
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    topic_arn = models.CharField(max_length=255)
+    subject = models.CharField(max_length=100, blank=True)
+    message = models.TextField()
+    message_attributes = models.TextField(blank=True, default="")  # JSON encoded
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_status_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"Outbox {self.pk} - {self.status}"
+
+
+class DashboardSummary(models.Model):
+    """
+    Single-row materialized totals for the dashboard.
+
+    Write paths adjust the counters as they go (see supplyapp.dashboard);
+    ``reconcile_dashboard`` periodically recomputes them from source.
+    """
+    SINGLETON_ID = 1
+
+    supplier_count = models.IntegerField(default=0)
+    po_count = models.IntegerField(default=0)
+    inventory_count = models.IntegerField(default=0)
+    finished_count = models.IntegerField(default=0)
+    order_count = models.IntegerField(default=0)
+    distributor_count = models.IntegerField(default=0)
+    customer_order_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    reconciled_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Dashboard summary (reconciled {self.reconciled_at})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    One row per submitted order form token.
+
+    The unique ``key`` makes a retried or double-clicked POST hit an
+    IntegrityError instead of creating a second order (see
+    supplyapp.idempotency).
+    """
+    key = models.CharField(max_length=64, unique=True)
+    scope = models.CharField(max_length=50)
+    result_id = models.CharField(max_length=100, blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"], name="idempotency_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} -> {self.result_id}"
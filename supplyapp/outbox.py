@@ -0,0 +1,109 @@
+import json
+from datetime import timedelta
+
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .aws import aws
+from .models import NotificationOutbox
+
+
+def enqueue_notification(subject, message, topic_arn=None, message_attributes=None):
+    """
+    Record an SNS message for later publishing.
+
+    Call this inside the caller's ``transaction.atomic()`` block so the
+    message is only stored if the change it describes is committed.
+    """
+    return NotificationOutbox.objects.create(
+        topic_arn=topic_arn or settings.AWS_SNS_TOPIC_ARN,
+        subject=subject[:100],
+        message=message,
+        message_attributes=json.dumps(message_attributes) if message_attributes else "",
+    )
+
+
+class OutboxDrainer:
+    """Publishes pending outbox rows to SNS in batches, with exponential backoff."""
+
+    # SNS PublishBatch accepts at most 10 entries per call
+    SNS_BATCH_SIZE = 10
+
+    def __init__(self, batch_limit=100, max_attempts=5, base_delay=5, max_delay=900, client=None):
+        self.batch_limit = batch_limit
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = aws.client("sns")
+        return self._client
+
+    def backoff(self, attempts):
+        return timedelta(seconds=min(self.base_delay * 2 ** (attempts - 1), self.max_delay))
+
+    def drain(self):
+        """Publish one round of due messages. Returns (sent, failed) counts."""
+        with transaction.atomic():
+            rows = list(
+                NotificationOutbox.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=NotificationOutbox.PENDING, next_attempt_at__lte=timezone.now())
+                .order_by("next_attempt_at", "id")[:self.batch_limit]
+            )
+            by_topic = {}
+            for row in rows:
+                by_topic.setdefault(row.topic_arn, []).append(row)
+
+            sent = failed = 0
+            for topic_arn, topic_rows in by_topic.items():
+                for start in range(0, len(topic_rows), self.SNS_BATCH_SIZE):
+                    ok, bad = self.publish_batch(topic_arn, topic_rows[start:start + self.SNS_BATCH_SIZE])
+                    sent += ok
+                    failed += bad
+        return sent, failed
+
+    def publish_batch(self, topic_arn, rows):
+        entries = []
+        for row in rows:
+            entry = {"Id": str(row.pk), "Message": row.message}
+            if row.subject:
+                entry["Subject"] = row.subject
+            if row.message_attributes:
+                entry["MessageAttributes"] = json.loads(row.message_attributes)
+            entries.append(entry)
+
+        try:
+            response = self.client.publish_batch(
+                TopicArn=topic_arn, PublishBatchRequestEntries=entries
+            )
+        except (ClientError, BotoCoreError) as e:
+            print(f"SNS publish_batch failed for {topic_arn}: {e}")
+            for row in rows:
+                self.mark_failed(row, str(e))
+            return 0, len(rows)
+
+        by_id = {str(row.pk): row for row in rows}
+        now = timezone.now()
+        sent_ids = [int(s["Id"]) for s in response.get("Successful", [])]
+        NotificationOutbox.objects.filter(pk__in=sent_ids).update(
+            status=NotificationOutbox.SENT, sent_at=now, last_error=""
+        )
+        failures = response.get("Failed", [])
+        for failure in failures:
+            self.mark_failed(by_id[failure["Id"]], failure.get("Message") or failure.get("Code", ""))
+        return len(sent_ids), len(failures)
+
+    def mark_failed(self, row, error):
+        row.attempts += 1
+        row.last_error = error
+        if row.attempts >= self.max_attempts:
+            row.status = NotificationOutbox.FAILED
+        else:
+            row.next_attempt_at = timezone.now() + self.backoff(row.attempts)
+        row.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
@@ -1,8 +1,9 @@
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
 import uuid
-import boto3
-from supplychainlib.aws_lambda import LambdaInvoker
+import base64
+from collections import defaultdict
+from datetime import date
 from botocore.exceptions import ClientError
 from supplychainlib.aws_dynamodb import (
     DynamoDBManager,
@@ -12,10 +13,18 @@ from supplychainlib.aws_dynamodb import (
     PurchaseOrderManager,
     DistributorOrderManager,
     DistributorInventoryManager,
+    CustomerOrderManager,
 )
 from supplychainlib.utility import TrackingUtility
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from .models import PurchaseOrderHistory, DistributorOrderHistory, CustomerOrderHistory
+from .stores import batch_get_items, get_by_blend, iter_table
+from .aws import aws
+from .cache import reference_cache
+from .dispatch import InvoiceDispatcher, invoice_dispatcher
+from . import dashboard
 from .invoice_generator import generate_and_upload_invoice
 from django.utils.timezone import now
 
@@ -24,7 +33,7 @@ class SupplierService:
     manager: SupplierManager
 
     def list_active(self) -> List[dict]:
-        return self.manager.scan()
+        return list(iter_table(self.manager.table))
 
     def create(self, name: str, product: str, price: float, origin: str) -> dict:
         item = {
@@ -35,9 +44,23 @@ class SupplierService:
             "origin": origin,
             "active": True,
         }
-        self.manager.put(item)
+        self.manager.put_item(item)
+        dashboard.record(supplier_count=1)
         return item
 
+@dataclass
+class SupplierLookupService:
+    """Keyed supplier reads instead of scanning the whole Suppliers table."""
+    manager: SupplierManager
+
+    def get(self, supplier_id: str) -> Optional[dict]:
+        if not supplier_id:
+            return None
+        return self.manager.get_item({"id": supplier_id})
+
+    def get_many(self, supplier_ids: Iterable[str]) -> Dict[str, dict]:
+        return batch_get_items(self.manager, "id", supplier_ids)
+
 @dataclass
 class RawMaterialService:
     manager: RawMaterialManager
@@ -65,7 +88,7 @@ class RawMaterialService:
             cost_per_pound = 0.0
             origin = "Unknown"
             if purchase_order:
-                supplier = SupplierManager().get_item({"id": purchase_order.supplier_id})
+                supplier = aws.manager(SupplierManager).get_item({"id": purchase_order.supplier_id})
                 if supplier:
                     product_name = supplier.get("product", "") or "Unnamed Material"
                     cost_per_pound = float(supplier.get("price_per_unit", 0))
@@ -80,6 +103,7 @@ class RawMaterialService:
                 "origin": origin,
                 "cost_per_pound": cost_per_pound,
             })
+            dashboard.record(inventory_count=delta)
             return
         
         # If it exists, just update quantity...
@@ -88,17 +112,20 @@ class RawMaterialService:
             update_expr="SET quantity = if_not_exists(quantity, :z) + :d",
             values={":d": int(delta), ":z": 0},
         )
+        dashboard.record(inventory_count=delta)
         
 @dataclass
 class PurchaseOrderService:
     manager: PurchaseOrderManager
     raw_materials: RawMaterialService
+    suppliers: SupplierLookupService = field(
+        default_factory=lambda: SupplierLookupService(aws.manager(SupplierManager))
+    )
+    invoices: InvoiceDispatcher = field(default_factory=lambda: invoice_dispatcher)
 
     def create(self, supplier_id: str, material_id: str, quantity: int, delivery_date: str) -> dict:
         po_id = TrackingUtility.generate("PO")
-        supplier_table = DynamoDBManager("Suppliers")
-        suppliers = supplier_table.scan_table()
-        supplier = next((s for s in suppliers if s.get("id") == supplier_id), None)
+        supplier = self.suppliers.get(supplier_id)
         raw_material_name = None
         price_per_unit = 0.0
         origin = ""
@@ -129,15 +156,13 @@ class PurchaseOrderService:
                 order_date=now().date(),
                 delivery_date=delivery_date, 
         )
+            dashboard.record(po_count=1)
         except Exception as e:
             print("ORM error:", e)
       
-        try:
-            invoker = LambdaInvoker(region_name="us-east-1")
-            lambda_response = invoker.invoke_function('GenerateInvoiceLambda', item)
-            print(f"Lambda invoked for PO {po_id}: {lambda_response}")
-        except Exception as e:
-            print(f"Lambda invoice generation failed for PO {po_id}: {e}")
+        # Invoice generation runs asynchronously, off the request thread, and
+        # only once the surrounding transaction (if any) has committed
+        transaction.on_commit(lambda: self.invoices.dispatch(item))
         return item
 
     def mark_received(self, po_id: str) -> None:
@@ -161,7 +186,7 @@ class FinishedProductService:
     raw_materials: RawMaterialService
 
     def create_from_raw(self, material_id: str, blend_name: str, units: int, unit_price: float) -> dict:
-        material = self.raw_materials.manager.get({"id": material_id})
+        material = self.raw_materials.manager.get_item({"id": material_id})
         if not material:
             raise ValueError("Raw material not found")
         if units <= 0 or units > int(material.get("quantity", 0)):
@@ -175,9 +200,125 @@ class FinishedProductService:
             "quantity": int(units),
             "unit_price": float(unit_price),
         }
-        self.manager.put(item)
+        self.manager.put_item(item)
         return item
 
+    def get_by_blend(self, blend_name: str) -> Optional[dict]:
+        """Single GSI read; blend names are not keys in FinishedProducts."""
+        return get_by_blend(self.manager, blend_name)
+
+class InsufficientStockError(ValueError):
+    """Raised when a stock decrement would take a counter below zero."""
+
+
+@dataclass
+class InventoryLedger:
+    """
+    Atomic stock counters on a DynamoDB table.
+
+    Every change is a single UpdateItem using ``ADD``, so concurrent
+    deliveries cannot overwrite each other, and decrements carry a
+    ConditionExpression so stock never goes negative. Attributes named in
+    ``set_once`` are only written when the item is created, so later
+    changes keep any value edited since.
+    """
+    manager: DynamoDBManager
+    key_name: str = "id"
+    set_once: tuple = ()
+
+    def add(self, key_value: str, quantity: int, attributes: Optional[dict] = None) -> int:
+        """Increase stock (creating the item if needed) and return the new quantity."""
+        return self._apply(key_value, int(quantity), attributes)
+
+    def remove(self, key_value: str, quantity: int) -> int:
+        """Decrease stock and return the new quantity, or raise InsufficientStockError."""
+        return self._apply(key_value, -int(quantity))
+
+    def update_request(self, key_value, delta, attributes=None) -> dict:
+        """UpdateItem parameters for ``delta``; negative deltas are guarded against underflow."""
+        values = {":d": delta}
+        names = {}
+        set_parts = []
+        for n, (attr, value) in enumerate((attributes or {}).items()):
+            names[f"#a{n}"] = attr
+            values[f":a{n}"] = value
+            if attr in self.set_once:
+                set_parts.append(f"#a{n} = if_not_exists(#a{n}, :a{n})")
+            else:
+                set_parts.append(f"#a{n} = :a{n}")
+        update_expr = "ADD quantity :d"
+        if set_parts:
+            update_expr = "SET " + ", ".join(set_parts) + " " + update_expr
+
+        params = {
+            "Key": {self.key_name: key_value},
+            "UpdateExpression": update_expr,
+            "ExpressionAttributeValues": values,
+        }
+        if names:
+            params["ExpressionAttributeNames"] = names
+        if delta < 0:
+            params["ConditionExpression"] = "attribute_exists(quantity) AND quantity >= :need"
+            values[":need"] = -delta
+        return params
+
+    def _apply(self, key_value, delta, attributes=None):
+        params = self.update_request(key_value, delta, attributes)
+        try:
+            response = self.manager.table.update_item(ReturnValues="UPDATED_NEW", **params)
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                raise InsufficientStockError(
+                    f"Not enough stock for {key_value} to remove {-delta} units"
+                )
+            raise
+        return int(response["Attributes"]["quantity"])
+
+
+# TransactWriteItems accepts at most 100 actions per request
+TRANSACT_WRITE_SIZE = 100
+
+
+def apply_stock_changes(changes) -> None:
+    """
+    Apply many (ledger, key_value, delta, attributes) counter changes with
+    TransactWriteItems.
+
+    Each key must appear once, so callers coalesce deltas first. Changes are
+    sent 100 per transaction; if a later transaction fails, the ones
+    already committed are reverted. A cancellation by a stock guard raises
+    InsufficientStockError; any other failure (e.g. a TransactionConflict
+    under contention) re-raises the ClientError.
+    """
+    changes = [c for c in changes if c[2]]
+    committed = []
+    for start in range(0, len(changes), TRANSACT_WRITE_SIZE):
+        chunk = changes[start:start + TRANSACT_WRITE_SIZE]
+        items = []
+        for ledger, key_value, delta, attributes in chunk:
+            update = ledger.update_request(key_value, delta, attributes)
+            update["TableName"] = ledger.manager.table.name
+            items.append({"Update": update})
+        client = chunk[0][0].manager.table.meta.client
+        try:
+            client.transact_write_items(TransactItems=items)
+        except ClientError as e:
+            reasons = e.response.get("CancellationReasons", [])
+            short = [
+                chunk[n][1] for n, r in enumerate(reasons)
+                if r.get("Code") == "ConditionalCheckFailed"
+            ]
+            # Undo the earlier transactions; no guard, these restore the prior totals
+            for ledger, key_value, delta, attributes in committed:
+                undo = ledger.update_request(key_value, -delta)
+                undo.pop("ConditionExpression", None)
+                undo["ExpressionAttributeValues"].pop(":need", None)
+                ledger.manager.table.update_item(**undo)
+            if not short:
+                raise
+            raise InsufficientStockError(f"Not enough stock for {', '.join(short)}")
+        committed.extend(chunk)
+
 @dataclass
 class DistributorOrderService:
     orders: DistributorOrderManager
@@ -185,7 +326,7 @@ class DistributorOrderService:
     finished: FinishedProductManager
 
     def create(self, distributor_id: str, product_id: str, quantity: int) -> dict:
-        product = self.finished.get({"id": product_id})
+        product = self.finished.get_item({"id": product_id})
         if not product:
             raise ValueError("Product not found")
         if quantity <= 0 or quantity > int(product.get("quantity", 0)):
@@ -198,25 +339,26 @@ class DistributorOrderService:
             "quantity": int(quantity),
             "status": "Placed",
         }
-        self.orders.put(item)
+        self.orders.put_item(item)
         return item
 
     def mark_received(self, order_id: str) -> None:
-        order = self.orders.get({"id": order_id})
+        order = self.orders.get_item({"id": order_id})
         if not order:
             return
-        self.orders.update(
+        self.orders.update_item(
             key={"id": order_id},
             update_expr="SET #s = :r",
             values={":r": "Received"},
             names={"#s": "status"},
         )
-        self.inventory.add_stock(
-            distributor_id=order["distributor_id"],
-            product_id=order["product_id"],
-            quantity=int(order.get("quantity", 0)),
+        # Write the key attributes too, so the row shows up in the distributor_id GSI
+        InventoryLedger(self.inventory).add(
+            f"{order['distributor_id']}#{order['product_id']}",
+            int(order.get("quantity", 0)),
+            {"distributor_id": order["distributor_id"], "product_id": order["product_id"]},
         )
-        self.finished.update(
+        self.finished.update_item(
             key={"id": order["product_id"]},
             update_expr="SET quantity = quantity - :q",
             values={":q": int(order.get("quantity", 0))},
@@ -224,10 +366,79 @@ class DistributorOrderService:
 
 # HISTORY SERVICES - NO @dataclass, NO ARGS IN CONSTRUCTOR
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+@dataclass
+class HistoryPage:
+    items: list
+    next_cursor: Optional[str]
+    cursor: Optional[str]
+    page_size: int
+
+
+def encode_cursor(order_date: date, order_id: str) -> str:
+    raw = f"{order_date.isoformat()}|{order_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Return (order_date, order_id), or None for a missing or tampered cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        order_date, order_id = raw.split("|", 1)
+        return date.fromisoformat(order_date), order_id
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def clamp_page_size(page_size) -> int:
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def keyset_page(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE) -> HistoryPage:
+    """
+    Newest-first page of ``queryset`` keyed on (order_date, order_id).
+
+    Each page seeks past the last row of the previous one instead of using
+    OFFSET, so the cost of a page does not grow with the depth of history.
+    """
+    page_size = clamp_page_size(page_size)
+    queryset = queryset.order_by("-order_date", "-order_id")
+    position = decode_cursor(cursor)
+    if position:
+        last_date, last_id = position
+        queryset = queryset.filter(
+            Q(order_date__lt=last_date) | Q(order_date=last_date, order_id__lt=last_id)
+        )
+    # One extra row tells us whether there is a next page
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].order_date, rows[-1].order_id)
+    return HistoryPage(
+        items=rows,
+        next_cursor=next_cursor,
+        cursor=cursor if position else None,
+        page_size=page_size,
+    )
+
+
 class PurchaseOrderHistoryService:
     def list_all(self):
         return PurchaseOrderHistory.objects.all()
 
+    def list_page(self, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        return keyset_page(PurchaseOrderHistory.objects.all(), cursor, page_size)
+
     def get_by_id(self, order_id):
         return PurchaseOrderHistory.objects.get(order_id=order_id)
 
@@ -241,6 +452,9 @@ class DistributorOrderHistoryService:
     def list_all(self):
         return DistributorOrderHistory.objects.all()
 
+    def list_page(self, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        return keyset_page(DistributorOrderHistory.objects.all(), cursor, page_size)
+
     def get_by_id(self, order_id):
         return DistributorOrderHistory.objects.get(order_id=order_id)
 
@@ -250,12 +464,183 @@ class DistributorOrderHistoryService:
         order.save()
         return order
 
+class BulkOrderStatusService:
+    """
+    Change the status of many history orders in one go.
+
+    Inventory effects are coalesced per counter (raw material, finished
+    product, distributor#product) and written with TransactWriteItems
+    before the statuses are saved with a single UPDATE per model. The
+    orders stay locked from the read to the save, so a concurrent request
+    for the same orders waits and then finds nothing left to change.
+    """
+    MAX_ORDERS = 1000
+
+    def __init__(self, raw_materials: Optional[RawMaterialService] = None):
+        self.raw_materials = raw_materials or RawMaterialService(aws.manager(RawMaterialManager))
+
+    @transaction.atomic
+    def update_purchase_orders(self, order_ids, new_status) -> int:
+        orders = self._changing(PurchaseOrderHistory, order_ids, new_status)
+        if orders and new_status == "Delivered":
+            deltas = defaultdict(int)
+            for order in orders:
+                deltas[order.raw_material] += int(order.quantity)
+            manager = self.raw_materials.manager
+            existing = batch_get_items(manager, "id", deltas)
+            ledger = InventoryLedger(manager)
+            apply_stock_changes(
+                [(ledger, mid, qty, None) for mid, qty in deltas.items() if mid in existing]
+            )
+            dashboard.record(inventory_count=sum(q for m, q in deltas.items() if m in existing))
+            # First delivery of a material: changequantity fills in supplier details
+            for mid, qty in deltas.items():
+                if mid not in existing:
+                    self.raw_materials.changequantity(mid, qty)
+        return self._save(PurchaseOrderHistory, orders, new_status)
+
+    @transaction.atomic
+    def update_distributor_orders(self, order_ids, new_status) -> int:
+        orders = self._changing(DistributorOrderHistory, order_ids, new_status)
+        if orders and new_status == "Delivered":
+            finished = InventoryLedger(aws.manager(FinishedProductManager), "finished_id")
+            distributor = InventoryLedger(aws.manager(DistributorInventoryManager))
+            finished_deltas = defaultdict(int)
+            distributor_deltas = defaultdict(int)
+            for order in orders:
+                finished_deltas[order.product_id] -= int(order.quantity)
+                distributor_deltas[(order.distributor_id, order.product_id)] += int(order.quantity)
+            changes = [(finished, pid, qty, None) for pid, qty in finished_deltas.items()]
+            changes += [
+                (distributor, f"{did}#{pid}", qty, {"distributor_id": did, "product_id": pid})
+                for (did, pid), qty in distributor_deltas.items()
+            ]
+            apply_stock_changes(changes)
+            dashboard.record(finished_count=sum(finished_deltas.values()))
+        return self._save(DistributorOrderHistory, orders, new_status)
+
+    @transaction.atomic
+    def update_customer_orders(self, order_ids, new_status) -> int:
+        orders = self._changing(CustomerOrderHistory, order_ids, new_status)
+        deltas = defaultdict(int)
+        for order in orders:
+            key = (order.distributor_id, order.product_id)
+            if new_status == "Delivered":
+                deltas[key] -= int(order.quantity)
+            elif order.status == "Delivered":
+                deltas[key] += int(order.quantity)
+        ledger = InventoryLedger(aws.manager(DistributorInventoryManager))
+        apply_stock_changes([
+            (ledger, f"{did}#{pid}", qty, {"distributor_id": did, "product_id": pid} if qty > 0 else None)
+            for (did, pid), qty in deltas.items()
+        ])
+        return self._save(CustomerOrderHistory, orders, new_status)
+
+    def _changing(self, model, order_ids, new_status):
+        # Called inside the caller's transaction: the row locks are held
+        # until the new status is saved
+        ids = list(dict.fromkeys(i for i in order_ids if i))
+        if len(ids) > self.MAX_ORDERS:
+            raise ValueError(f"At most {self.MAX_ORDERS} orders per request.")
+        return list(model.objects.select_for_update().filter(pk__in=ids).exclude(status=new_status))
+
+    def _save(self, model, orders, new_status) -> int:
+        # Every row gets the same status, so one UPDATE covers them all
+        return model.objects.filter(pk__in=[o.pk for o in orders]).update(status=new_status)
+
+class ConversionService:
+    """
+    Convert raw material stock into finished blends.
+
+    Ratios, prices and the finished product each blend is stocked under
+    come from the Recipes table. Raw materials are read by key, and every
+    raw decrement and finished increment in a batch is written with
+    TransactWriteItems, so a batch either fully applies or not at all.
+    """
+    MAX_CONVERSIONS = 50
+
+    def __init__(self, raw_materials: Optional[RawMaterialService] = None):
+        self.raw_materials = raw_materials or RawMaterialService(aws.manager(RawMaterialManager))
+
+    def convert(self, conversions) -> List[dict]:
+        """
+        Apply ``conversions``, a list of ``(material_id, blend_name, units)``.
+        ``units`` is the number of finished units to make; None converts as
+        much of the material as the recipe allows. Returns one dict per
+        conversion with the units made and raw units used.
+
+        Raises ValueError for unknown materials or blends or more than
+        MAX_CONVERSIONS conversions, and InsufficientStockError (a
+        ValueError) if stock ran short.
+        """
+        conversions = list(conversions)
+        if len(conversions) > self.MAX_CONVERSIONS:
+            raise ValueError(f"At most {self.MAX_CONVERSIONS} conversions per request.")
+        recipes = reference_cache.get_many("Recipes", [blend for _, blend, _ in conversions])
+        materials = batch_get_items(self.raw_materials.manager, "id", [m for m, _, _ in conversions])
+
+        available = {mid: int(item.get("quantity", 0)) for mid, item in materials.items()}
+        raw_deltas = defaultdict(int)
+        finished_deltas = defaultdict(int)
+        results = []
+        finished_manager = aws.manager(FinishedProductManager)
+        for material_id, blend_name, units in conversions:
+            recipe = recipes.get(blend_name)
+            if not recipe:
+                raise ValueError(f"No recipe for {blend_name}.")
+            if not recipe.get("finished_id"):
+                # Recipe added by hand: stock the blend under its existing product
+                product = get_by_blend(finished_manager, blend_name)
+                if not product:
+                    raise ValueError(f"Recipe for {blend_name} has no finished product.")
+                recipe = recipes[blend_name] = {**recipe, "finished_id": product["finished_id"]}
+            if material_id not in materials:
+                raise ValueError(f"Raw material {material_id} not found.")
+            ratio = int(recipe.get("raw_per_unit", 0))
+            if ratio <= 0:
+                raise ValueError(f"Recipe for {blend_name} has no raw_per_unit ratio.")
+            if units is None:
+                units = available[material_id] // ratio
+            units = int(units)
+            if units < 0:
+                raise ValueError("Units must not be negative.")
+            available[material_id] -= units * ratio
+            raw_deltas[material_id] -= units * ratio
+            finished_deltas[recipe["finished_id"]] += units
+            results.append({
+                "material_id": material_id,
+                "blend_name": blend_name,
+                "units": units,
+                "raw_used": units * ratio,
+            })
+
+        raw = InventoryLedger(self.raw_materials.manager)
+        # The recipe price only seeds a new product; an edited price is kept
+        finished = InventoryLedger(finished_manager, "finished_id", set_once=("unit_price",))
+        blend_for = {recipes[b]["finished_id"]: recipes[b] for _, b, _ in conversions}
+        changes = [(raw, mid, delta, None) for mid, delta in raw_deltas.items()]
+        # Name and price are written too, so a blend's first conversion creates its product
+        changes += [
+            (finished, fid, units, {
+                "blend_name": blend_for[fid]["blend_name"],
+                "unit_price": blend_for[fid].get("unit_price", 0),
+            })
+            for fid, units in finished_deltas.items()
+        ]
+        apply_stock_changes(changes)
+
+        made = sum(finished_deltas.values())
+        if made:
+            dashboard.record(inventory_count=sum(raw_deltas.values()), finished_count=made)
+            reference_cache.invalidate("FinishedProducts")
+        return results
+
 class CustomerOrderService:
     """
     Service for managing live customer orders using DynamoDB.
     """
     def __init__(self):
-        self.manager = CustomerOrderManager()
+        self.manager = aws.manager(CustomerOrderManager)
 
     def create(self, customer_id, product_id, quantity, status):
         """
@@ -269,7 +654,7 @@ class CustomerOrderService:
             "quantity": quantity,
             "status": status,
         }
-        self.manager.put(item)
+        self.manager.put_item(item)
         return item
 
 class CustomerOrderHistoryService:
@@ -295,43 +680,15 @@ class CustomerOrderHistoryService:
         """
         return CustomerOrderHistory.objects.all().order_by("-order_date")
 
-class InventoryService:
-    def __init__(self):
-        self.bucket_name = settings.AWS_S3_BUCKET_NAME
-        self.s3_manager = S3Manager(self.bucket_name)
-        self.invoice_generator = InvoiceGenerator()
-
-    def generate_and_upload_invoice(self, po):
-        invoice_key = self.invoice_generator.generate_po_invoice(po)
-        return invoice_key
-
-    def get_invoice_url(self, s3_key):
-        try:
-            url = self.s3_manager.s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': s3_key},
-                ExpiresIn=3600
-            )
-            return url
-        except Exception as e:
-            print(f"Error generating presigned URL: {e}")
-            return None
-
-    def upload_invoice_file(self, file_obj, object_name):
-        try:
-            self.s3_manager.upload_fileobj(file_obj, object_name)
-            return True
-        except Exception as e:
-            print(f"Upload failed: {e}")
-            return False
-
+    def list_page(self, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        """
+        One newest-first page of historical customer orders.
+        """
+        return keyset_page(CustomerOrderHistory.objects.all(), cursor, page_size)
 
 class CognitoService:
     def __init__(self):
-        self.client = boto3.client(
-            "cognito-idp",
-            region_name=settings.COGNITO_REGION
-        )
+        self.client = aws.client("cognito-idp", settings.COGNITO_REGION)
 
     def sign_up(self, email, password):
         try:
@@ -346,7 +703,7 @@ class CognitoService:
             return {"success": True, "response": response}
 
         except ClientError as e:
-            return {"error": e.response["Error"]["Message"]}
+            return {"error": e.response["Error"]["Message"], "code": e.response["Error"]["Code"]}
 
     def auto_confirm_user(self, email):
         try:
@@ -383,19 +740,20 @@ class CognitoService:
             return {"success": True, "tokens": response["AuthenticationResult"]}
 
         except ClientError as e:
-            return {"error": e.response["Error"]["Message"]}
+            return {"error": e.response["Error"]["Message"], "code": e.response["Error"]["Code"]}
 
-    def user_exists(self, email):
+    def refresh(self, refresh_token):
+        """New access/id tokens for a stored refresh token."""
         try:
-            self.client.admin_get_user(
-                UserPoolId=settings.COGNITO_USER_POOL_ID,
-                Username=email
+            response = self.client.initiate_auth(
+                ClientId=settings.COGNITO_CLIENT_ID,
+                AuthFlow="REFRESH_TOKEN_AUTH",
+                AuthParameters={"REFRESH_TOKEN": refresh_token},
             )
-            return True
-        except self.client.exceptions.UserNotFoundException:
-            return False
-        except ClientError:
-            return False
+            return {"success": True, "tokens": response["AuthenticationResult"]}
+
+        except ClientError as e:
+            return {"error": e.response["Error"]["Message"], "code": e.response["Error"]["Code"]}
 
     def logout(self, access_token):
         try:
@@ -1,5 +1,10 @@
-import boto3
+import time
+
+from .aws import aws
+from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
+from django.conf import settings
+from supplychainlib.aws_dynamodb import DynamoDBManager
 
 
 # ===============================================================
@@ -9,7 +14,7 @@ class DynamoBase:
     """Base class providing common DynamoDB CRUD methods."""
 
     def __init__(self, table_name, key_name, region_name='us-east-1'):
-        self.dynamodb = boto3.resource('dynamodb', region_name=region_name)
+        self.dynamodb = aws.resource('dynamodb', region_name)
         self.table = self.dynamodb.Table(table_name)
         self.table_name = table_name
         self.key_name = key_name
@@ -36,12 +41,19 @@ class DynamoBase:
     # List all records
     def list_items(self):
         try:
-            response = self.table.scan()
-            return response.get('Items', [])
+            return list(self.iter_items())
         except ClientError as e:
             print(f"Error scanning {self.table_name}: {e}")
             return []
 
+    # Stream records page by page
+    def iter_items(self, projection=None, filter=None, page_size=None,
+                   segment=None, total_segments=None):
+        return iter_table(
+            self.table, projection=projection, filter=filter, page_size=page_size,
+            segment=segment, total_segments=total_segments,
+        )
+
     # Update record by key
     def update_item(self, key_value, update_expression, values_dict, names=None):
         try:
@@ -64,11 +76,249 @@ class DynamoBase:
             print(f"Item deleted from {self.table_name}: {key_value}")
         except ClientError as e:
             print(f"Error deleting item from {self.table_name}: {e}")
+
+
+def iter_table(table, projection=None, filter=None, page_size=None,
+               segment=None, total_segments=None):
+    """
+    Yield every item of a boto3 ``Table``, following ``LastEvaluatedKey``
+    so results are not cut off at DynamoDB's 1 MB page limit.
+
+    ``projection`` is a list of attribute names to fetch, ``filter`` a
+    boto3 condition (``Attr("quantity").gt(0)``) and ``page_size`` the
+    scan ``Limit``. Pass ``segment``/``total_segments`` to read one slice
+    of a parallel scan.
+
+    A ``ClientError`` part way through propagates to the caller rather
+    than ending the iteration, so a failed scan is never mistaken for a
+    complete one.
+    """
+    kwargs = {}
+    if projection:
+        # Placeholders keep reserved words such as "name" and "status" legal
+        names = {f"#p{n}": attr for n, attr in enumerate(projection)}
+        kwargs["ProjectionExpression"] = ", ".join(names)
+        kwargs["ExpressionAttributeNames"] = names
+    if filter is not None:
+        kwargs["FilterExpression"] = filter
+    if page_size:
+        kwargs["Limit"] = page_size
+    if total_segments:
+        kwargs["Segment"] = segment or 0
+        kwargs["TotalSegments"] = total_segments
+
+    while True:
+        response = table.scan(**kwargs)
+        yield from response.get("Items", [])
+        if "LastEvaluatedKey" not in response:
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+# table name -> (checked at, DescribeTable ItemCount)
+_item_counts = {}
+
+
+def table_item_count(table_name):
+    """
+    The approximate item count DynamoDB reports for ``table_name``. It is
+    only refreshed by DynamoDB every few hours, so it is cached for
+    ``SCAN_ITEM_COUNT_TTL`` seconds. None if the table cannot be described.
+    """
+    ttl = getattr(settings, "SCAN_ITEM_COUNT_TTL", 3600)
+    checked = _item_counts.get(table_name)
+    if checked and time.monotonic() - checked[0] < ttl:
+        return checked[1]
+    try:
+        count = aws.client("dynamodb").describe_table(TableName=table_name)["Table"].get("ItemCount", 0)
+    except ClientError as e:
+        print(f"Error describing {table_name}: {e}")
+        return None
+    _item_counts[table_name] = (time.monotonic(), count)
+    return count
+
+
+def scan_segments(table_name):
+    """
+    How many segments a whole-table scan of ``table_name`` should use.
+
+    Parallel segments only pay off on large tables; on small ones the extra
+    requests and threads make the scan slower. So this is 1 unless the
+    table holds at least ``SCAN_PARALLEL_MIN_ITEMS`` items (unset: never),
+    in which case it is ``SCAN_SEGMENTS``.
+    """
+    segments = getattr(settings, "SCAN_SEGMENTS", 1)
+    threshold = getattr(settings, "SCAN_PARALLEL_MIN_ITEMS", None)
+    if segments <= 1 or threshold is None:
+        return 1
+    count = table_item_count(table_name)
+    return segments if count is not None and count >= threshold else 1
+
+
+def scan_aggregate(table_name, aggregate, combine, segments=None, **scan_options):
+    """
+    Scan of ``table_name`` split into ``segments`` parallel slices (by
+    default as many as ``scan_segments`` picks for the table's size).
+
+    Each slice is streamed through ``aggregate(items) -> partial`` on its own
+    thread (with its own boto3 resource), then ``combine(partials)`` reduces
+    the partial results. ``scan_options`` are passed on to ``iter_table``.
+
+    The whole scan is bounded by ``SCAN_AGGREGATE_TIMEOUT`` seconds and
+    raises ``FanOutTimeout`` past it. A single segment runs inline, so
+    there the deadline is checked as items arrive; each page request is
+    bounded by the client's ``AWS_READ_TIMEOUT``.
+    """
+    from .concurrency import Call, FanOutTimeout, gather
+
+    segments = segments or scan_segments(table_name)
+    timeout = getattr(settings, "SCAN_AGGREGATE_TIMEOUT", 120)
+    deadline = time.monotonic() + timeout
+
+    def before_deadline(items):
+        for item in items:
+            if time.monotonic() > deadline:
+                raise FanOutTimeout(f"Scan of {table_name} did not finish within {timeout}s")
+            yield item
+
+    def scan_segment(segment):
+        items = iter_table(
+            aws.table(table_name), segment=segment, total_segments=segments, **scan_options
+        )
+        return aggregate(before_deadline(items))
+
+    return combine(gather(*(Call(scan_segment, n) for n in range(segments)), timeout=timeout))
+
+
+def sum_attribute(table_name, attribute, segments=None, **scan_options):
+    """Total of a numeric attribute across a table, e.g. stock ``quantity``."""
+    return scan_aggregate(
+        table_name,
+        lambda items: sum(int(i.get(attribute, 0)) for i in items),
+        sum,
+        segments,
+        projection=[attribute],
+        **scan_options
+    )
+
+
+def scan_all(table_name, segments=None, **scan_options):
+    """Every item of ``table_name``, read with a parallel scan."""
+    return scan_aggregate(
+        table_name, list, lambda parts: [i for part in parts for i in part], segments, **scan_options
+    )
+
+
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_SIZE = 100
+BATCH_GET_RETRIES = 5
+
+
+def batch_get_items(manager, key_name, key_values):
+    """Return {key: item} for every key that exists, using BatchGetItem."""
+    return batch_get_tables([(manager, key_name, key_values)]).get(manager.table.name, {})
+
+
+def batch_get_tables(requests):
+    """
+    Point-read keys from several tables in as few BatchGetItem calls as
+    possible. ``requests`` is a list of ``(manager, key_name, key_values)``;
+    returns {table name: {key: item}} for every key that exists.
+    """
+    pending = []
+    key_names = {}
+    client = None
+    for manager, key_name, key_values in requests:
+        table = manager.table
+        client = client or table.meta.client
+        key_names[table.name] = key_name
+        pending.extend(
+            (table.name, k) for k in dict.fromkeys(k for k in key_values if k)
+        )
+
+    found = {name: {} for name in key_names}
+    for start in range(0, len(pending), BATCH_GET_SIZE):
+        request = {}
+        for table_name, key_value in pending[start:start + BATCH_GET_SIZE]:
+            request.setdefault(table_name, {"Keys": []})["Keys"].append(
+                {key_names[table_name]: key_value}
+            )
+        attempts = 0
+        while request and attempts < BATCH_GET_RETRIES:
+            try:
+                response = client.batch_get_item(RequestItems=request)
+            except ClientError as e:
+                print(f"Error batch-reading {', '.join(request)}: {e}")
+                break
+            for table_name, items in response.get("Responses", {}).items():
+                key_name = key_names[table_name]
+                for item in items:
+                    found[table_name][item[key_name]] = item
+            # DynamoDB may hand back keys it did not get to under throttling
+            request = response.get("UnprocessedKeys") or None
+            attempts += 1
+    return found
+
+
+def query_for_distributor(manager, distributor_id, index_name=None):
+    """
+    Every DistributorInventory item for one distributor, read through the
+    ``distributor_id`` GSI rather than a full-table scan. A failed page
+    raises rather than returning the items read so far.
+    """
+    if not distributor_id:
+        return []
+    index_name = index_name or getattr(settings, "DISTRIBUTOR_INVENTORY_INDEX", "distributor_id-index")
+    kwargs = {
+        "IndexName": index_name,
+        "KeyConditionExpression": Key("distributor_id").eq(distributor_id),
+    }
+    items = []
+    while True:
+        response = manager.table.query(**kwargs)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return items
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def get_by_blend(manager, blend_name, index_name=None):
+    """
+    The FinishedProducts item for ``blend_name``, read through the
+    ``blend_name`` GSI instead of scanning the table. None if there is none.
+    """
+    if not blend_name:
+        return None
+    index_name = index_name or getattr(settings, "FINISHED_PRODUCT_BLEND_INDEX", "blend_name-index")
+    try:
+        response = manager.table.query(
+            IndexName=index_name,
+            KeyConditionExpression=Key("blend_name").eq(blend_name),
+            Limit=1,
+        )
+    except ClientError as e:
+        print(f"Error querying {manager.table.name} for blend {blend_name}: {e}")
+        return None
+    items = response.get("Items", [])
+    return items[0] if items else None
+
+
 # ===============================================================
 # Table-specific classes
 # ===============================================================
 
 
+class RecipeManager(DynamoDBManager):
+    """
+    Blend recipes, keyed by ``blend_name``: raw units consumed per finished
+    unit (``raw_per_unit``), ``unit_price`` and the FinishedProducts key
+    (``finished_id``) the blend is stocked under.
+    """
+
+    def __init__(self):
+        super().__init__("Recipes")
+
+
 class SupplierStore(DynamoBase):
     """Handles Supplier data stored in DynamoDB."""
 
@@ -120,6 +370,9 @@ class FinishedProductStore(DynamoBase):
         }
         return self.create_item(item)
 
+    def get_by_blend(self, blend_name):
+        return get_by_blend(self, blend_name)
+
 
 class PurchaseOrderStore(DynamoBase):
     """Handles Purchase Orders stored in DynamoDB."""
@@ -1,3 +1,1138 @@
+from datetime import date
+from unittest import skipUnless
+
+from django.db.models import Q
 from django.test import TestCase
 
-# Create your tests here.
+from .models import PurchaseOrderHistory, DistributorOrderHistory, CustomerOrderHistory
+
+# Imported before the views build their module-level clients, so moto can
+# intercept them once started.
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+
+class OrderHistoryQueryPlanTests(TestCase):
+    """The hot history queries should be answered from the composite indexes."""
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"expected {index_name} in plan:\n{plan}")
+
+    def test_customer_order_details_uses_customer_date_index(self):
+        qs = CustomerOrderHistory.objects.filter(customer_name="a@example.com").order_by("-order_date")
+        self.assertUsesIndex(qs, "cust_hist_customer_date_idx")
+
+    def test_history_keyset_page_uses_date_index(self):
+        last_date, last_id = date(2025, 1, 1), "order-1"
+        for model, index_name in (
+            (CustomerOrderHistory, "cust_hist_date_idx"),
+            (DistributorOrderHistory, "dist_hist_date_idx"),
+            (PurchaseOrderHistory, "po_hist_date_idx"),
+        ):
+            # Same shape as services.keyset_page() builds for a follow-up page
+            qs = model.objects.order_by("-order_date", "-order_id").filter(
+                Q(order_date__lt=last_date) | Q(order_date=last_date, order_id__lt=last_id)
+            )[:51]
+            self.assertUsesIndex(qs, index_name)
+
+    def test_distributor_status_filter_uses_index(self):
+        qs = DistributorOrderHistory.objects.filter(distributor_id="D1", status="Delivered")
+        self.assertUsesIndex(qs, "dist_hist_dist_status_idx")
+
+    def test_customer_distributor_status_filter_uses_index(self):
+        qs = CustomerOrderHistory.objects.filter(distributor_id="D1", status="Processing")
+        self.assertUsesIndex(qs, "cust_hist_dist_status_idx")
+
+    def test_purchase_orders_by_supplier_use_index(self):
+        qs = PurchaseOrderHistory.objects.filter(supplier_id="S1").order_by("order_date")
+        self.assertUsesIndex(qs, "po_hist_supplier_date_idx")
+
+    def test_purchase_orders_by_material_use_index(self):
+        qs = PurchaseOrderHistory.objects.filter(raw_material="RM-1")
+        self.assertUsesIndex(qs, "po_hist_material_idx")
+
+
+@skipUnless(mock_aws, "moto is not installed")
+class MotoTestCase(TestCase):
+    """Runs each test against a fresh moto backend with every table provisioned."""
+
+    def setUp(self):
+        from . import benchmark
+        from .aws import aws
+
+        self.mock = mock_aws()
+        self.mock.start()
+        benchmark.provision()
+        self.dynamodb = aws.resource("dynamodb")
+
+    def tearDown(self):
+        from .aws import aws
+        from .cache import reference_cache
+
+        self.mock.stop()
+        aws.clear()
+        reference_cache.clear()
+
+    def quantity(self, table, key):
+        item = self.dynamodb.Table(table).get_item(Key=key).get("Item")
+        return None if item is None else int(item["quantity"])
+
+
+class InventoryLedgerTests(MotoTestCase):
+    """Counters change atomically and never go below zero."""
+
+    def setUp(self):
+        super().setUp()
+        from supplychainlib.aws_dynamodb import RawMaterialManager
+
+        from .aws import aws
+        from .services import InventoryLedger
+
+        self.ledger = InventoryLedger(aws.manager(RawMaterialManager))
+
+    def test_add_creates_and_increments(self):
+        self.assertEqual(self.ledger.add("RM-1", 5, {"name": "Bean"}), 5)
+        self.assertEqual(self.ledger.add("RM-1", 3), 8)
+        self.assertEqual(self.quantity("RawMaterials", {"id": "RM-1"}), 8)
+
+    def test_remove_is_guarded(self):
+        from .services import InsufficientStockError
+
+        self.ledger.add("RM-1", 2)
+        with self.assertRaises(InsufficientStockError):
+            self.ledger.remove("RM-1", 3)
+        with self.assertRaises(InsufficientStockError):
+            self.ledger.remove("RM-missing", 1)
+        self.assertEqual(self.ledger.remove("RM-1", 2), 0)
+
+    def test_failed_later_chunk_reverts_committed_chunks(self):
+        from .services import InsufficientStockError, TRANSACT_WRITE_SIZE, apply_stock_changes
+
+        for n in range(TRANSACT_WRITE_SIZE):
+            self.ledger.add(f"RM-{n}", 10)
+        # The first transaction commits; the second is cancelled by the guard
+        changes = [(self.ledger, f"RM-{n}", -4, None) for n in range(TRANSACT_WRITE_SIZE)]
+        changes.append((self.ledger, "RM-short", -1, None))
+        with self.assertRaises(InsufficientStockError):
+            apply_stock_changes(changes)
+        self.assertEqual(
+            {self.quantity("RawMaterials", {"id": f"RM-{n}"}) for n in range(TRANSACT_WRITE_SIZE)}, {10}
+        )
+
+
+@skipUnless(mock_aws, "moto is not installed")
+class ViewBenchmarkTests(TestCase):
+    """Every view renders against moto, within a per-request DynamoDB call budget."""
+
+    # More than this usually means a new full scan or an N+1 lookup
+    MAX_DYNAMODB_CALLS = 10
+
+    def tearDown(self):
+        from .aws import aws
+        from .cache import reference_cache
+
+        aws.clear()
+        reference_cache.clear()
+
+    def run_benchmark(self):
+        from . import benchmark
+
+        with mock_aws():
+            benchmark.provision()
+            ids = benchmark.seed({
+                "suppliers": 10, "raw_materials": 10, "finished_products": 5,
+                "distributors": 5, "orders": 30,
+            })
+            return benchmark.run(ids, runs=2)
+
+    def test_views_within_budget(self):
+        from . import benchmark
+
+        results = self.run_benchmark()
+        self.assertTrue(results)
+        problems = benchmark.check_budgets(results, max_dynamodb_calls=self.MAX_DYNAMODB_CALLS)
+        self.assertEqual(problems, [])
+
+        by_view = {r["view"]: r for r in results}
+        # Point reads, not scans, once the reference cache is warm
+        self.assertLessEqual(by_view["customer_order_form"]["dynamodb_calls"], 1)
+        self.assertLessEqual(by_view["get_product_details"]["dynamodb_calls"], 2)
+        self.assertEqual(by_view["dashboard"]["dynamodb_calls"], 0)
+
+
+class CognitoTokenTests(TestCase):
+    """Access tokens are verified locally against the (cached) user pool keys."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        cls.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def setUp(self):
+        from .cognito_tokens import JWKSCache, TokenVerifier
+
+        self.fetches = 0
+        self.verifier = TokenVerifier(JWKSCache(fetch=self.jwks), leeway=60)
+
+    def jwks(self):
+        import base64
+
+        def b64(number):
+            raw = number.to_bytes((number.bit_length() + 7) // 8, "big")
+            return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+        self.fetches += 1
+        numbers = self.key.public_key().public_numbers()
+        return {"keys": [{"kty": "RSA", "kid": "k1", "e": b64(numbers.e), "n": b64(numbers.n)}]}
+
+    def make_token(self, key=None, **overrides):
+        import base64
+        import json
+        import time
+
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding
+        from django.conf import settings
+
+        from .cognito_tokens import issuer
+
+        def b64(data):
+            return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+        claims = {
+            "iss": issuer(), "token_use": "access", "client_id": settings.COGNITO_CLIENT_ID,
+            "exp": int(time.time()) + 3600, "username": "a@example.com",
+        }
+        claims.update(overrides)
+        signing_input = f'{b64(json.dumps({"alg": "RS256", "kid": "k1"}).encode())}.{b64(json.dumps(claims).encode())}'
+        signature = (key or self.key).sign(signing_input.encode(), padding.PKCS1v15(), hashes.SHA256())
+        return f"{signing_input}.{b64(signature)}"
+
+    def test_valid_token_verifies_with_one_jwks_fetch(self):
+        for _ in range(3):
+            claims = self.verifier.verify(self.make_token())
+        self.assertEqual(claims["username"], "a@example.com")
+        self.assertEqual(self.fetches, 1)
+
+    def test_expired_token(self):
+        import time
+
+        from .cognito_tokens import ExpiredToken
+
+        with self.assertRaises(ExpiredToken):
+            self.verifier.verify(self.make_token(exp=int(time.time()) - 120))
+
+    def test_token_for_another_client(self):
+        from .cognito_tokens import InvalidToken
+
+        with self.assertRaises(InvalidToken):
+            self.verifier.verify(self.make_token(client_id="someone-else"))
+
+    def test_bad_signature(self):
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        from .cognito_tokens import InvalidToken
+
+        other = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        with self.assertRaises(InvalidToken):
+            self.verifier.verify(self.make_token(key=other))
+
+    def test_unknown_kid_refetch_is_rate_limited(self):
+        from unittest import mock
+
+        from .cognito_tokens import JWKSCache
+
+        jwks = JWKSCache(fetch=self.jwks, min_refresh=60)
+        with mock.patch("supplyapp.cognito_tokens.time.monotonic", return_value=1000.0) as clock:
+            self.assertIsNotNone(jwks.get("k1"))
+            for _ in range(3):
+                self.assertIsNone(jwks.get("forged"))
+            self.assertEqual(self.fetches, 1)
+            clock.return_value = 1061.0
+            jwks.get("forged")
+            self.assertEqual(self.fetches, 2)
+
+    def test_failed_fetch_backs_off(self):
+        from unittest import mock
+
+        from .cognito_tokens import JWKSCache
+
+        attempts = []
+
+        def unreachable():
+            attempts.append(1)
+            raise OSError("timed out")
+
+        jwks = JWKSCache(fetch=unreachable, min_refresh=60)
+        with mock.patch("supplyapp.cognito_tokens.time.monotonic", return_value=1000.0) as clock:
+            for _ in range(5):
+                self.assertIsNone(jwks.get("k1"))
+            self.assertEqual(len(attempts), 1)
+            clock.return_value = 1061.0
+            jwks.get("k1")
+            self.assertEqual(len(attempts), 2)
+
+
+class ProtectedRoutesTests(TestCase):
+    """Login rules are matched per method, with static assets bypassed."""
+
+    def setUp(self):
+        from .auth_middleware import ProtectedRoutes
+
+        self.routes = ProtectedRoutes(
+            [("/customer/orders/", "*"), ("/customer/orders/new/", ["POST"]), ("/po/", ["post"])],
+            exempt=["/static/"],
+        )
+
+    def test_prefix_for_every_method(self):
+        self.assertTrue(self.routes.is_protected("GET", "/customer/orders/details/"))
+        self.assertTrue(self.routes.is_protected("DELETE", "/customer/orders/1/"))
+        self.assertFalse(self.routes.is_protected("GET", "/customer/"))
+
+    def test_method_specific_rule(self):
+        self.assertTrue(self.routes.is_protected("POST", "/po/new/"))
+        self.assertFalse(self.routes.is_protected("GET", "/po/new/"))
+
+    def test_exempt_prefix_wins(self):
+        self.assertFalse(self.routes.is_protected("GET", "/static/customer/orders/app.css"))
+
+    def test_redirects_without_token(self):
+        response = self.client.get("/customer/orders/details/")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], "/login/")
+
+
+@skipUnless(mock_aws, "moto is not installed")
+class ConversionServiceTests(TestCase):
+    """Raw-to-finished conversions follow the recipe table and apply atomically."""
+
+    def setUp(self):
+        from . import benchmark
+        from .aws import aws
+
+        self.mock = mock_aws()
+        self.mock.start()
+        benchmark.provision()
+        dynamodb = aws.resource("dynamodb")
+        self.raw = dynamodb.Table("RawMaterials")
+        self.finished = dynamodb.Table("FinishedProducts")
+        dynamodb.Table("Recipes").put_item(Item={
+            "blend_name": "House", "finished_id": "FP-HOUSE", "raw_per_unit": 3, "unit_price": 20,
+        })
+        self.raw.put_item(Item={"id": "RM-1", "quantity": 10})
+        self.raw.put_item(Item={"id": "RM-2", "quantity": 2})
+
+    def tearDown(self):
+        from .aws import aws
+        from .cache import reference_cache
+
+        self.mock.stop()
+        aws.clear()
+        reference_cache.clear()
+
+    def quantity(self, table, key):
+        return int(table.get_item(Key=key)["Item"]["quantity"])
+
+    def test_converts_by_recipe_ratio(self):
+        from .services import ConversionService
+
+        results = ConversionService().convert([("RM-1", "House", None)])
+        self.assertEqual(results[0]["units"], 3)
+        self.assertEqual(self.quantity(self.raw, {"id": "RM-1"}), 1)
+        self.assertEqual(self.quantity(self.finished, {"finished_id": "FP-HOUSE"}), 3)
+
+    def test_short_batch_changes_nothing(self):
+        from .services import ConversionService, InsufficientStockError
+
+        with self.assertRaises(InsufficientStockError):
+            ConversionService().convert([("RM-1", "House", 2), ("RM-2", "House", 1)])
+        self.assertEqual(self.quantity(self.raw, {"id": "RM-1"}), 10)
+        self.assertNotIn("Item", self.finished.get_item(Key={"finished_id": "FP-HOUSE"}))
+
+    def test_too_many_conversions_is_rejected(self):
+        from .services import ConversionService
+
+        conversions = [("RM-1", "House", 0)] * (ConversionService.MAX_CONVERSIONS + 1)
+        with self.assertRaises(ValueError):
+            ConversionService().convert(conversions)
+        self.assertEqual(self.quantity(self.raw, {"id": "RM-1"}), 10)
+
+    def test_recipe_price_only_seeds_new_products(self):
+        from decimal import Decimal
+
+        from .services import ConversionService
+
+        ConversionService().convert([("RM-1", "House", 1)])
+        item = self.finished.get_item(Key={"finished_id": "FP-HOUSE"})["Item"]
+        self.assertEqual(item["unit_price"], Decimal(20))
+        self.finished.update_item(
+            Key={"finished_id": "FP-HOUSE"}, UpdateExpression="SET unit_price = :p",
+            ExpressionAttributeValues={":p": Decimal("27.5")},
+        )
+        ConversionService().convert([("RM-1", "House", 1)])
+        item = self.finished.get_item(Key={"finished_id": "FP-HOUSE"})["Item"]
+        self.assertEqual((item["unit_price"], item["quantity"]), (Decimal("27.5"), 2))
+
+    def test_recipe_without_product_key_uses_blend_index(self):
+        from .aws import aws
+        from .services import ConversionService
+
+        aws.resource("dynamodb").Table("Recipes").put_item(Item={
+            "blend_name": "Decaf", "raw_per_unit": 5, "unit_price": 22,
+        })
+        self.finished.put_item(Item={"finished_id": "FP-DECAF", "blend_name": "Decaf", "quantity": 1})
+        ConversionService().convert([("RM-1", "Decaf", 2)])
+        self.assertEqual(self.quantity(self.finished, {"finished_id": "FP-DECAF"}), 3)
+        self.assertEqual(self.quantity(self.raw, {"id": "RM-1"}), 0)
+
+    def cancel_transactions(self, code="TransactionConflict"):
+        """Patch botocore so every TransactWriteItems is cancelled with ``code``."""
+        from unittest import mock
+
+        from botocore.client import BaseClient
+        from botocore.exceptions import ClientError
+
+        make_api_call = BaseClient._make_api_call
+
+        def call(client, operation, params):
+            if operation == "TransactWriteItems":
+                raise ClientError({
+                    "Error": {"Code": "TransactionCanceledException", "Message": "Transaction cancelled"},
+                    "CancellationReasons": [{"Code": code} for _ in params["TransactItems"]],
+                }, operation)
+            return make_api_call(client, operation, params)
+
+        return mock.patch.object(BaseClient, "_make_api_call", autospec=True, side_effect=call)
+
+    def test_conflicting_transaction_is_not_reported_as_short_stock(self):
+        from botocore.exceptions import ClientError
+
+        from .services import ConversionService, InsufficientStockError
+
+        with self.cancel_transactions(), self.assertRaises(ClientError) as caught:
+            ConversionService().convert([("RM-1", "House", 1)])
+        self.assertNotIsInstance(caught.exception, InsufficientStockError)
+        self.assertEqual(self.quantity(self.raw, {"id": "RM-1"}), 10)
+
+    def test_views_report_cancelled_transactions(self):
+        import json
+
+        from django.contrib.messages import get_messages
+        from django.urls import reverse
+
+        with self.cancel_transactions():
+            response = self.client.post(reverse("convert_to_finished", args=["RM-1"]), {"blend_name": "House"})
+            self.assertRedirects(response, reverse("inventory_dashboard"), fetch_redirect_response=False)
+            self.assertIn("Conversion failed", str(list(get_messages(response.wsgi_request))[0]))
+
+            response = self.client.post(
+                reverse("batch_convert"),
+                json.dumps({"conversions": [{"material_id": "RM-1", "blend_name": "House", "units": 1}]}),
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.quantity(self.raw, {"id": "RM-1"}), 10)
+
+
+class FakeSNS:
+    """Records publish_batch calls and fails the entries whose message is in ``reject``."""
+
+    def __init__(self, reject=(), error=None):
+        self.reject = set(reject)
+        self.error = error
+        self.calls = []
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        self.calls.append((TopicArn, [e["Id"] for e in PublishBatchRequestEntries]))
+        if self.error:
+            raise self.error
+        ok = [e for e in PublishBatchRequestEntries if e["Message"] not in self.reject]
+        bad = [e for e in PublishBatchRequestEntries if e["Message"] in self.reject]
+        return {
+            "Successful": [{"Id": e["Id"]} for e in ok],
+            "Failed": [{"Id": e["Id"], "Code": "InternalError"} for e in bad],
+        }
+
+
+class OutboxDrainerTests(TestCase):
+    """Due rows are published in SNS-sized batches and retried with backoff."""
+
+    def enqueue(self, count, topic_arn="arn:aws:sns:us-east-1:123456789012:orders"):
+        from .outbox import enqueue_notification
+
+        return [enqueue_notification(f"Order {n}", f"message {n}", topic_arn) for n in range(count)]
+
+    def test_drain_publishes_in_batches_and_marks_sent(self):
+        from .models import NotificationOutbox
+        from .outbox import OutboxDrainer
+
+        self.enqueue(12)
+        sns = FakeSNS()
+        self.assertEqual(OutboxDrainer(client=sns).drain(), (12, 0))
+        self.assertEqual([len(ids) for _, ids in sns.calls], [10, 2])
+        self.assertEqual(NotificationOutbox.objects.filter(status=NotificationOutbox.SENT).count(), 12)
+        # Nothing left to publish
+        self.assertEqual(OutboxDrainer(client=sns).drain(), (0, 0))
+
+    def test_failed_entries_back_off_then_fail(self):
+        from django.utils import timezone
+
+        from .models import NotificationOutbox
+        from .outbox import OutboxDrainer
+
+        ok, bad = self.enqueue(2)
+        drainer = OutboxDrainer(max_attempts=2, client=FakeSNS(reject={bad.message}))
+        self.assertEqual(drainer.drain(), (1, 1))
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), (NotificationOutbox.PENDING, 1))
+        self.assertGreater(bad.next_attempt_at, timezone.now())
+        # Not due yet, so the next round skips it
+        self.assertEqual(drainer.drain(), (0, 0))
+
+        NotificationOutbox.objects.filter(pk=bad.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(drainer.drain(), (0, 1))
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), (NotificationOutbox.FAILED, 2))
+
+    def test_client_error_fails_the_whole_batch(self):
+        from botocore.exceptions import EndpointConnectionError
+
+        from .models import NotificationOutbox
+        from .outbox import OutboxDrainer
+
+        self.enqueue(3)
+        sns = FakeSNS(error=EndpointConnectionError(endpoint_url="https://sns"))
+        self.assertEqual(OutboxDrainer(client=sns).drain(), (0, 3))
+        self.assertEqual(NotificationOutbox.objects.filter(attempts=1, status=NotificationOutbox.PENDING).count(), 3)
+
+
+class RunOnceTests(TestCase):
+    """A form token creates at most one order."""
+
+    def setUp(self):
+        self.calls = 0
+
+    def action(self):
+        self.calls += 1
+        return f"order-{self.calls}"
+
+    def test_duplicate_key_replays_first_result(self):
+        from .idempotency import issue, run_once
+
+        key = issue()
+        self.assertEqual(run_once(key, "customer_order", self.action), ("order-1", False))
+        self.assertEqual(run_once(key, "customer_order", self.action), ("order-1", True))
+        self.assertEqual(self.calls, 1)
+
+    def test_key_from_another_form_is_rejected(self):
+        from .idempotency import issue, run_once
+
+        key = issue()
+        run_once(key, "customer_order", self.action)
+        with self.assertRaises(ValueError):
+            run_once(key, "distributor_order", self.action)
+        self.assertEqual(self.calls, 1)
+
+    def test_failed_action_releases_key(self):
+        from .idempotency import issue, run_once
+        from .models import IdempotencyKey
+
+        def fail():
+            raise RuntimeError("boom")
+
+        key = issue()
+        with self.assertRaises(RuntimeError):
+            run_once(key, "customer_order", fail)
+        self.assertFalse(IdempotencyKey.objects.filter(key=key).exists())
+        self.assertEqual(run_once(key, "customer_order", self.action), ("order-1", False))
+
+    def test_missing_key_always_runs(self):
+        from .idempotency import run_once
+
+        run_once("", "customer_order", self.action)
+        run_once(None, "customer_order", self.action)
+        self.assertEqual(self.calls, 2)
+
+
+class BulkOrderStatusViewTests(MotoTestCase):
+    """Bulk status changes apply inventory effects once and reject malformed bodies."""
+
+    def setUp(self):
+        super().setUp()
+        self.dynamodb.Table("FinishedProducts").put_item(Item={"finished_id": "FP-1", "quantity": 10})
+        for n in range(2):
+            DistributorOrderHistory.objects.create(
+                order_id=f"DO-{n}", distributor_id="D-1", product_id="FP-1",
+                quantity=3, status="Pending", order_date=date(2025, 1, 1),
+            )
+
+    def post_json(self, payload, kind="distributor"):
+        import json
+
+        return self.client.post(
+            f"/orders/{kind}/bulk-status/", json.dumps(payload), content_type="application/json"
+        )
+
+    def test_delivery_applies_inventory_once(self):
+        payload = {"order_ids": ["DO-0", "DO-1"], "status": "Delivered"}
+        response = self.post_json(payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["updated"], 2)
+        # A repeated request finds both orders already delivered
+        self.assertEqual(self.post_json(payload).json()["updated"], 0)
+        self.assertEqual(self.quantity("FinishedProducts", {"finished_id": "FP-1"}), 4)
+        self.assertEqual(self.quantity("DistributorInventory", {"id": "D-1#FP-1"}), 6)
+
+    def test_malformed_bodies_are_rejected(self):
+        for payload in (
+            ["DO-0"],
+            {"order_ids": "DO-0", "status": "Delivered"},
+            {"order_ids": [{"id": "DO-0"}], "status": "Delivered"},
+            {"order_ids": ["DO-0"], "status": ["Delivered"]},
+            {"order_ids": ["DO-0"]},
+        ):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post_json(payload).status_code, 400)
+        self.assertFalse(DistributorOrderHistory.objects.filter(status="Delivered").exists())
+
+    def test_too_many_orders_is_rejected(self):
+        from .services import BulkOrderStatusService
+
+        ids = [f"DO-{n}" for n in range(BulkOrderStatusService.MAX_ORDERS + 1)]
+        response = self.post_json({"order_ids": ids, "status": "Delivered"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.quantity("FinishedProducts", {"finished_id": "FP-1"}), 10)
+
+    def test_unknown_kind(self):
+        self.assertEqual(self.post_json({"order_ids": ["DO-0"], "status": "Delivered"}, "supplier").status_code, 404)
+
+
+class ChangeDistributorOrderStatusViewTests(MotoTestCase):
+    """Delivering a distributor order moves finished stock exactly once."""
+
+    def setUp(self):
+        super().setUp()
+        self.dynamodb.Table("FinishedProducts").put_item(Item={"finished_id": "FP-1", "quantity": 10})
+        DistributorOrderHistory.objects.create(
+            order_id="DO-0", distributor_id="D-1", product_id="FP-1",
+            quantity=3, status="Pending", order_date=date(2025, 1, 1),
+        )
+
+    def test_repeated_delivery_applies_inventory_once(self):
+        from django.urls import reverse
+
+        url = reverse("change_distributor_order_status", args=["DO-0"])
+        for _ in range(2):
+            self.client.post(url, {"status": "Delivered"})
+        self.assertEqual(DistributorOrderHistory.objects.get(order_id="DO-0").status, "Delivered")
+        self.assertEqual(self.quantity("FinishedProducts", {"finished_id": "FP-1"}), 7)
+        self.assertEqual(self.quantity("DistributorInventory", {"id": "D-1#FP-1"}), 3)
+
+    def test_short_stock_leaves_order_pending(self):
+        from django.urls import reverse
+
+        DistributorOrderHistory.objects.filter(order_id="DO-0").update(quantity=11)
+        self.client.post(reverse("change_distributor_order_status", args=["DO-0"]), {"status": "Delivered"})
+        self.assertEqual(DistributorOrderHistory.objects.get(order_id="DO-0").status, "Pending")
+        self.assertEqual(self.quantity("FinishedProducts", {"finished_id": "FP-1"}), 10)
+
+
+class SupplierManagerViewTests(MotoTestCase):
+    """The supplier counter follows items actually created and deleted."""
+
+    def supplier_count(self):
+        from .models import DashboardSummary
+
+        return DashboardSummary.objects.get().supplier_count
+
+    def test_repeated_add_and_delete_count_once(self):
+        from django.urls import reverse
+
+        from . import dashboard
+
+        dashboard.reconcile()
+        form = {"action": "add", "supplier_id": "S-1", "name": "Beans Co", "price_per_unit": "4.5"}
+        for name in ("Beans Co", "Beans Ltd"):
+            self.client.post(reverse("supplier_manage"), {**form, "name": name})
+        self.assertEqual(self.supplier_count(), 1)
+        item = self.dynamodb.Table("Suppliers").get_item(Key={"id": "S-1"})["Item"]
+        self.assertEqual(item["name"], "Beans Ltd")
+
+        for _ in range(2):
+            self.client.post(reverse("supplier_delete", args=["S-1"]), {"action": "delete"})
+        self.assertEqual(self.supplier_count(), 0)
+
+
+class DistributorInventoryQueryTests(MotoTestCase):
+    """A failed distributor query is reported, never returned as partial stock."""
+
+    def test_query_failure_propagates(self):
+        from botocore.exceptions import ClientError
+        from supplychainlib.aws_dynamodb import DistributorInventoryManager
+
+        from .aws import aws
+        from .stores import query_for_distributor
+
+        with self.assertRaises(ClientError):
+            query_for_distributor(aws.manager(DistributorInventoryManager), "D-1", "missing-index")
+
+    def test_order_form_reports_inventory_unavailable(self):
+        import time
+
+        from django.test import override_settings
+
+        session = self.client.session
+        session.update({"access_token": "token", "token_expires_at": int(time.time()) + 3600})
+        session.save()
+        self.dynamodb.Table("DistributorInventory").put_item(Item={
+            "id": "D-1#FP-1", "distributor_id": "D-1", "product_id": "FP-1", "quantity": 5,
+        })
+        with override_settings(DISTRIBUTOR_INVENTORY_INDEX="missing-index"):
+            response = self.client.get("/customer/orders/new/", {"distributor": "D-1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.context["inventory_error"])
+        self.assertEqual(response.context["finished_products"], [])
+
+
+class DistributorInventoryBackfillTests(MotoTestCase):
+    """Legacy rows keyed only by "dist#prod" become visible to the distributor index."""
+
+    def test_backfill_fills_index_attributes(self):
+        from django.conf import settings
+        from supplychainlib.aws_dynamodb import DistributorInventoryManager
+
+        from .aws import aws
+        from .management.commands.provision_cloud import DynamoProvisioner
+        from .stores import query_for_distributor
+
+        table = self.dynamodb.Table("DistributorInventory")
+        table.put_item(Item={"id": "D-1#FP-1", "quantity": 5})
+        table.put_item(Item={"id": "D-1#FP-2", "distributor_id": "D-1", "product_id": "FP-2", "quantity": 2})
+        table.put_item(Item={"id": "malformed", "quantity": 1})
+        manager = aws.manager(DistributorInventoryManager)
+        self.assertEqual([i["id"] for i in query_for_distributor(manager, "D-1")], ["D-1#FP-2"])
+
+        provisioner = DynamoProvisioner(settings.AWS_REGION)
+        self.assertEqual(provisioner.backfill_distributor_inventory(), 1)
+        self.assertEqual(provisioner.backfill_distributor_inventory(), 0)
+        self.assertEqual(
+            sorted(i["id"] for i in query_for_distributor(manager, "D-1")), ["D-1#FP-1", "D-1#FP-2"]
+        )
+        item = table.get_item(Key={"id": "D-1#FP-1"})["Item"]
+        self.assertEqual((item["distributor_id"], item["product_id"], item["quantity"]), ("D-1", "FP-1", 5))
+
+
+class FailingScanTable:
+    """A Table stand-in whose scan fails after ``pages`` good pages."""
+
+    name = "RawMaterials"
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def scan(self, **kwargs):
+        from botocore.exceptions import ClientError
+
+        if self.pages == 0:
+            raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "Scan")
+        self.pages -= 1
+        return {"Items": [{"id": "RM-1", "quantity": 1}], "LastEvaluatedKey": {"id": "RM-1"}}
+
+
+class ScanFailureTests(MotoTestCase):
+    """A scan that fails part way never produces totals."""
+
+    def test_iter_table_raises_instead_of_truncating(self):
+        from botocore.exceptions import ClientError
+
+        from .stores import iter_table
+
+        with self.assertRaises(ClientError):
+            list(iter_table(FailingScanTable(pages=2)))
+
+    def test_reconcile_leaves_summary_untouched(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        from . import dashboard
+        from .models import DashboardSummary
+
+        summary = dashboard.reconcile()
+        self.dynamodb.Table("RawMaterials").delete()
+        with self.assertRaises(CommandError):
+            call_command("reconcile_dashboard")
+        self.assertEqual(
+            DashboardSummary.objects.get(pk=DashboardSummary.SINGLETON_ID).reconciled_at, summary.reconciled_at
+        )
+
+    def test_views_report_unreadable_inventory(self):
+        self.dynamodb.Table("RawMaterials").delete()
+        response = self.client.get("/inventory/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context["raw_total"])
+        self.assertIsNone(response.context["finished_total"])
+        self.assertTrue(response.context["inventory_error"])
+
+        response = self.client.get("/dashboard/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["summary_error"])
+
+
+class ScanSegmentsTests(MotoTestCase):
+    """Whole-table scans only go parallel on tables above the configured size."""
+
+    def setUp(self):
+        super().setUp()
+        from . import stores
+
+        stores._item_counts.clear()
+        self.addCleanup(stores._item_counts.clear)
+        table = self.dynamodb.Table("RawMaterials")
+        for n in range(5):
+            table.put_item(Item={"id": f"RM-{n}", "quantity": n})
+
+    def test_small_table_scans_sequentially(self):
+        from django.test import override_settings
+
+        from .stores import scan_segments, sum_attribute
+
+        with override_settings(SCAN_SEGMENTS=4, SCAN_PARALLEL_MIN_ITEMS=100):
+            self.assertEqual(scan_segments("RawMaterials"), 1)
+            self.assertEqual(sum_attribute("RawMaterials", "quantity"), 10)
+        with override_settings(SCAN_SEGMENTS=4, SCAN_PARALLEL_MIN_ITEMS=None):
+            self.assertEqual(scan_segments("RawMaterials"), 1)
+
+    def test_large_table_scans_in_parallel(self):
+        from django.test import override_settings
+
+        from .stores import scan_segments, sum_attribute
+
+        with override_settings(SCAN_SEGMENTS=4, SCAN_PARALLEL_MIN_ITEMS=5):
+            self.assertEqual(scan_segments("RawMaterials"), 4)
+            self.assertEqual(sum_attribute("RawMaterials", "quantity"), 10)
+            self.assertEqual(scan_segments("Missing"), 1)
+
+
+class RequestTimingTests(TestCase):
+    """Timing hooks stay scoped to the app and the timings view to staff."""
+
+    def test_hooks_are_not_global(self):
+        from botocore.handlers import BUILTIN_HANDLERS
+        from django.template.backends.django import Template
+
+        from .timing_middleware import TimedTemplate, _BOTO_HOOKS
+
+        self.assertFalse(set(_BOTO_HOOKS) & set(BUILTIN_HANDLERS))
+        self.assertNotEqual(Template.render, TimedTemplate.render)
+
+    def test_template_time_is_recorded(self):
+        from .timing_middleware import recent_timings
+
+        self.client.get("/login/")
+        self.assertGreater(recent_timings.snapshot()[-1]["template_ms"], 0)
+
+    def test_timings_view_requires_staff(self):
+        from django.contrib.auth.models import User
+        from django.test import override_settings
+
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get("/debug/timings/").status_code, 404)
+        with override_settings(REQUEST_TIMINGS_VIEW_PUBLIC=True):
+            self.assertEqual(self.client.get("/debug/timings/").status_code, 200)
+
+        staff = User.objects.create_user("ops", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get("/debug/timings/").status_code, 200)
+
+
+class CheckBudgetsTests(TestCase):
+    def test_non_200_status_is_a_violation(self):
+        from . import benchmark
+
+        results = [
+            {"view": name, "status": status, "p95_ms": 1.0, "dynamodb_calls": 0}
+            for name, status in (("ok", 200), ("redirected", 302), ("missing", 404))
+        ]
+        problems = benchmark.check_budgets(results)
+        self.assertEqual(len(problems), 2)
+        self.assertIn("redirected returned 302, expected 200", problems)
+
+
+class InvoiceCatalogTests(MotoTestCase):
+    """Invoice pages come from one cached listing of the bucket."""
+
+    FILES = ["beans.csv", "Blend-March.pdf", "blend-april.pdf", "cups.csv", "filters.csv"]
+
+    def setUp(self):
+        super().setUp()
+        from django.conf import settings
+
+        from .aws import aws
+        from .invoices import InvoiceCatalog
+
+        self.s3 = aws.client("s3")
+        self.bucket = settings.AWS_S3_BUCKET_NAME
+        for n, name in enumerate(self.FILES):
+            self.put(f"inventory/2025010{n + 1}_120000_{name}")
+        self.catalog = InvoiceCatalog(ttl=300, page_size=2)
+
+    def put(self, key):
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=b"invoice")
+
+    def names(self, entries):
+        return [e["original_name"] for e in entries]
+
+    def test_pages_follow_cursor_without_gaps(self):
+        seen, cursor = [], None
+        for _ in range(len(self.FILES)):
+            entries, cursor = self.catalog.page(cursor=cursor)
+            self.assertLessEqual(len(entries), 2)
+            seen.extend(entries)
+            if cursor is None:
+                break
+        self.assertEqual(self.names(seen), self.FILES)
+        self.assertTrue(all(e["url"] for e in seen))
+
+    def test_name_filter_ignores_upload_timestamp(self):
+        entries, cursor = self.catalog.page(prefix="blend", page_size=10)
+        self.assertEqual(self.names(entries), ["Blend-March.pdf", "blend-april.pdf"])
+        self.assertIsNone(cursor)
+        # The stored name still matches too
+        entries, _ = self.catalog.page(prefix="20250104", page_size=10)
+        self.assertEqual(self.names(entries), ["cups.csv"])
+
+    def test_filtered_pages_resume_after_cursor(self):
+        entries, cursor = self.catalog.page(prefix="b", page_size=1)
+        self.assertEqual(self.names(entries), ["beans.csv"])
+        entries, cursor = self.catalog.page(cursor=cursor, prefix="b", page_size=1)
+        self.assertEqual(self.names(entries), ["Blend-March.pdf"])
+        entries, cursor = self.catalog.page(cursor=cursor, prefix="b", page_size=1)
+        self.assertEqual((self.names(entries), cursor), (["blend-april.pdf"], None))
+
+    def test_manifest_is_cached_until_invalidated(self):
+        self.assertEqual(len(self.catalog.manifest()), 5)
+        self.put("inventory/20250201_120000_late.csv")
+        self.assertEqual(len(self.catalog.manifest()), 5)
+        self.catalog.invalidate()
+        self.assertEqual(self.names(self.catalog.manifest())[-1], "late.csv")
+
+
+class InvoiceUploadTests(MotoTestCase):
+    """Direct-to-S3 uploads are signed for, and registered from, the invoice prefix only."""
+
+    def setUp(self):
+        super().setUp()
+        from django.conf import settings
+
+        from .aws import aws
+        from .invoices import InvoiceCatalog
+
+        self.s3 = aws.client("s3")
+        self.bucket = settings.AWS_S3_BUCKET_NAME
+        self.catalog = InvoiceCatalog(ttl=300)
+
+    def test_presigned_upload_targets_a_fresh_key_under_the_prefix(self):
+        post = self.catalog.presigned_upload("../../etc/passwd")
+        self.assertRegex(post["key"], r"^inventory/\d{8}_\d{6}_passwd$")
+        self.assertEqual(post["fields"]["key"], post["key"])
+        self.assertTrue(post["url"])
+
+    def test_register_rejects_keys_outside_the_prefix(self):
+        self.s3.put_object(Bucket=self.bucket, Key="private/report.csv", Body=b"x")
+        for key in ("", "inventory/", "private/report.csv", "../inventory/x.csv"):
+            with self.subTest(key=key):
+                self.assertIsNone(self.catalog.register_upload(key))
+
+    def test_register_rejects_unknown_keys(self):
+        self.assertIsNone(self.catalog.register_upload("inventory/20250101_120000_missing.csv"))
+
+    def test_register_adds_the_upload_to_the_catalog(self):
+        self.assertEqual(self.catalog.manifest(), [])
+        key = self.catalog.upload_key("beans.csv")
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=b"invoice")
+        entry = self.catalog.register_upload(key)
+        self.assertEqual((entry["key"], entry["size"]), (key, 7))
+        self.assertEqual([e["key"] for e in self.catalog.manifest()], [key])
+
+    def test_endpoints(self):
+        from django.urls import reverse
+
+        response = self.client.post(reverse("sign_inventory_upload"), {"filename": "beans.csv"})
+        self.assertEqual(response.status_code, 200)
+        key = response.json()["key"]
+        self.assertEqual(self.client.post(reverse("sign_inventory_upload")).status_code, 400)
+
+        complete = reverse("complete_inventory_upload")
+        self.assertEqual(self.client.post(complete, {"key": key}).status_code, 404)
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=b"invoice")
+        self.assertEqual(self.client.post(complete, {"key": key}).json()["key"], key)
+        self.assertEqual(self.client.post(complete, {"key": "private/report.csv"}).status_code, 404)
+
+
+class PresignedUrlCacheTests(TestCase):
+    """Download links are reused until the refresh margin, from a bounded cache."""
+
+    def setUp(self):
+        from unittest import mock
+
+        self.signed = []
+
+        def sign(operation, Params, ExpiresIn):
+            self.signed.append(Params["Key"])
+            return f"https://s3/{Params['Key']}?n={len(self.signed)}&expires={ExpiresIn}"
+
+        s3 = mock.Mock()
+        s3.generate_presigned_url.side_effect = sign
+        patcher = mock.patch("supplyapp.invoices.aws.client", return_value=s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        clock = mock.patch("supplyapp.cache.time.monotonic", return_value=1000.0)
+        self.clock = clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_url_is_resigned_once_inside_the_margin(self):
+        from .invoices import PresignedUrlCache
+
+        urls = PresignedUrlCache(bucket="b", expires_in=3600, refresh_margin=600, maxsize=10)
+        first = urls.url("inventory/a.csv")
+        self.clock.return_value = 1000.0 + 2999
+        self.assertEqual(urls.url("inventory/a.csv"), first)
+        self.clock.return_value = 1000.0 + 3001
+        self.assertNotEqual(urls.url("inventory/a.csv"), first)
+        self.assertEqual(len(self.signed), 2)
+
+    def test_zero_margin_and_size_are_respected(self):
+        from .invoices import PresignedUrlCache
+
+        urls = PresignedUrlCache(bucket="b", expires_in=60, refresh_margin=0, maxsize=10)
+        urls.url("inventory/a.csv")
+        self.clock.return_value = 1000.0 + 59
+        urls.url("inventory/a.csv")
+        self.assertEqual(len(self.signed), 1)
+
+        uncached = PresignedUrlCache(bucket="b", expires_in=60, refresh_margin=0, maxsize=0)
+        uncached.url("inventory/a.csv")
+        uncached.url("inventory/a.csv")
+        self.assertEqual(len(self.signed), 3)
+
+    def test_least_recently_used_url_is_evicted(self):
+        from .invoices import PresignedUrlCache
+
+        urls = PresignedUrlCache(bucket="b", expires_in=3600, refresh_margin=600, maxsize=2)
+        urls.url("a")
+        urls.url("b")
+        urls.url("a")
+        urls.url("c")  # evicts "b"
+        urls.url("a")
+        urls.url("b")
+        self.assertEqual(self.signed, ["a", "b", "c", "b"])
+
+
+class ReferenceDataCacheTests(MotoTestCase):
+    """Listings come from the real supplychainlib managers and are cached per TTL."""
+
+    def test_names_scan_once_until_invalidated(self):
+        from .cache import ReferenceDataCache
+
+        suppliers = self.dynamodb.Table("Suppliers")
+        suppliers.put_item(Item={"id": "SUP-1", "name": "Andes Farms"})
+        cache = ReferenceDataCache()
+        self.assertEqual(cache.names("Suppliers"), {"SUP-1": "Andes Farms"})
+
+        suppliers.put_item(Item={"id": "SUP-2", "name": "Kona Growers"})
+        self.assertEqual(len(cache.all("Suppliers")), 1)
+        cache.invalidate("Suppliers")
+        self.assertEqual(cache.names("Suppliers"), {"SUP-1": "Andes Farms", "SUP-2": "Kona Growers"})
+
+    def test_every_table_lists_through_its_manager(self):
+        from .cache import ReferenceDataCache
+
+        cache = ReferenceDataCache()
+        for table in ReferenceDataCache.TABLES:
+            with self.subTest(table=table):
+                self.assertIsInstance(cache.all(table), list)
+
+    def test_failed_scan_is_not_cached(self):
+        from botocore.exceptions import ClientError
+
+        from .cache import ReferenceDataCache
+
+        cache = ReferenceDataCache()
+        self.dynamodb.Table("Distributors").delete()
+        with self.assertRaises(ClientError):
+            cache.all("Distributors")
+        self.assertIsNone(cache._caches["Distributors"].get(ReferenceDataCache.ALL))
+
+
+class PurchaseOrderHistoryViewTests(MotoTestCase):
+    def test_missing_material_names_are_read_by_key(self):
+        from .models import PurchaseOrderHistory
+
+        self.dynamodb.Table("RawMaterials").put_item(Item={"id": "RM-1", "name": "Green Arabica"})
+        self.dynamodb.Table("Suppliers").put_item(Item={"id": "SUP-1", "name": "Andes Farms"})
+        for n, name in enumerate((None, "Robusta")):
+            PurchaseOrderHistory.objects.create(
+                order_id=f"PO-{n}", supplier_id="SUP-1", raw_material=f"RM-{n + 1}",
+                raw_material_name=name, quantity=1, status="Sent", order_date=date(2025, 1, 1),
+            )
+        response = self.client.get("/purchase-orders/history/")
+        self.assertEqual(response.status_code, 200)
+        names = {o.order_id: (o.raw_material_name, o.supplier_name) for o in response.context["orders"]}
+        self.assertEqual(names, {
+            "PO-0": ("Green Arabica", "Andes Farms"), "PO-1": ("Robusta", "Andes Farms"),
+        })
+
+
+class ViewAwsTimingTests(MotoTestCase):
+    """AWS calls made through the view services show up in the request timings."""
+
+    def test_purchase_order_form_counts_dynamodb_calls(self):
+        from .timing_middleware import recent_timings
+
+        self.dynamodb.Table("Suppliers").put_item(Item={"id": "SUP-1", "name": "Andes Farms"})
+        response = self.client.get("/purchase-orders/new/")
+        self.assertEqual(response.status_code, 200)
+        timings = recent_timings.snapshot()[-1]
+        self.assertEqual(timings["path"], "/purchase-orders/new/")
+        self.assertGreater(timings["services"].get("dynamodb", {}).get("count", 0), 0)
+
+
+class ScanTimeoutTests(MotoTestCase):
+    """A scan past SCAN_AGGREGATE_TIMEOUT is reported like any failed scan."""
+
+    def setUp(self):
+        super().setUp()
+        self.dynamodb.Table("RawMaterials").put_item(Item={"id": "RM-1", "quantity": 5})
+
+    def test_single_and_parallel_scans_are_bounded(self):
+        from django.test import override_settings
+
+        from .concurrency import FanOutTimeout
+        from .stores import sum_attribute
+
+        with override_settings(SCAN_AGGREGATE_TIMEOUT=0):
+            for segments in (1, 2):
+                with self.subTest(segments=segments), self.assertRaises(FanOutTimeout):
+                    sum_attribute("RawMaterials", "quantity", segments)
+
+    def test_views_and_reconcile_report_timeouts(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from django.test import override_settings
+
+        with override_settings(SCAN_AGGREGATE_TIMEOUT=0):
+            response = self.client.get("/inventory/")
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context["inventory_error"])
+
+            response = self.client.get("/dashboard/")
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context["summary_error"])
+
+            with self.assertRaises(CommandError):
+                call_command("reconcile_dashboard")
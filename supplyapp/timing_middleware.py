@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.template.backends.django import DjangoTemplates, Template as DjangoTemplate
+
+from .aws import aws
+
+
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Per-request counters, shared with fan-out threads through the context."""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+        self.db_count = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.services = {}  # service name -> [call count, ms]
+        self._lock = threading.Lock()
+
+    def add_service(self, service, ms):
+        with self._lock:
+            entry = self.services.setdefault(service, [0, 0.0])
+            entry[0] += 1
+            entry[1] += ms
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        parts = [f"total;dur={self.total_ms:.1f}"]
+        parts.append(f'db;desc="ORM {self.db_count} queries";dur={self.db_ms:.1f}')
+        for service, (count, ms) in sorted(self.services.items()):
+            name = service.replace("-", "")
+            parts.append(f'{name};desc="{service} {count} calls";dur={ms:.1f}')
+        parts.append(f"template;dur={self.template_ms:.1f}")
+        return ", ".join(parts)
+
+    def as_dict(self):
+        return {
+            "method": self.method,
+            "path": self.path,
+            "total_ms": round(self.total_ms, 2),
+            "db": {"count": self.db_count, "ms": round(self.db_ms, 2)},
+            "services": {
+                service: {"count": count, "ms": round(ms, 2)}
+                for service, (count, ms) in sorted(self.services.items())
+            },
+            "template_ms": round(self.template_ms, 2),
+        }
+
+
+class TimingBuffer:
+    """The last N request timings, newest last."""
+
+    def __init__(self, size):
+        self._items = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, timings):
+        with self._lock:
+            self._items.append(timings.as_dict())
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._items)
+
+
+recent_timings = TimingBuffer(getattr(settings, "REQUEST_TIMING_BUFFER_SIZE", 200))
+
+
+# ------------------------------------------------------------------
+# Hooks. Each one is a no-op outside a timed request.
+# ------------------------------------------------------------------
+
+def _before_aws_call(context=None, **kwargs):
+    if context is not None and _current.get() is not None:
+        context["timing_started"] = time.perf_counter()
+
+
+def _after_aws_call(event_name=None, context=None, **kwargs):
+    timings = _current.get()
+    if timings is None or not context or "timing_started" not in context:
+        return
+    # event names look like "after-call.dynamodb.Scan"
+    service = event_name.split(".")[1]
+    timings.add_service(service, (time.perf_counter() - context.pop("timing_started")) * 1000)
+
+
+def _time_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_count += 1
+        timings.db_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedTemplate(DjangoTemplate):
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, with render time added to the current
+    request's timings. Select it as the ``BACKEND`` in ``TEMPLATES``.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+_BOTO_HOOKS = [
+    ("before-call", _before_aws_call),
+    ("after-call", _after_aws_call),
+    ("after-call-error", _after_aws_call),
+]
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install_hooks():
+    """
+    Register the botocore hooks on the AWS client registry, once per
+    process. Only clients and resources from ``aws`` are timed, so AWS
+    access in request paths must go through the registry (``aws.manager``
+    for supplychainlib managers); botocore's global handlers are left
+    alone. Called from AppConfig.ready.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        aws.register_event_hooks(_BOTO_HOOKS)
+        _installed = True
+
+
+class RequestTimingMiddleware:
+    """
+    Records total latency, ORM queries, AWS calls per service and template
+    render time for every request. Template time needs the
+    ``TimedDjangoTemplates`` backend.
+
+    The breakdown is returned in a ``Server-Timing`` header (visible in the
+    browser's network panel) and kept in a ring buffer served by
+    ``RequestTimingsView``. Place it first in MIDDLEWARE so the total
+    covers the rest of the stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "REQUEST_TIMING_ENABLED", True)
+        if self.enabled:
+            install_hooks()
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        timings = RequestTimings(request.method, request.path)
+        token = _current.set(timings)
+        try:
+            with connection.execute_wrapper(_time_query):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+            timings.finish()
+            recent_timings.append(timings)
+
+        response["Server-Timing"] = timings.server_timing()
+        return response
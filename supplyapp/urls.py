@@ -10,7 +10,10 @@ from .views import (
     PO_StatusView,
     InventoryDashboardView,
     ConvertRawToFinishedView,
+    BatchConvertView,
     UploadInventoryFileView,
+    InventoryUploadSignView,
+    InventoryUploadCompleteView,
     DeleteInvoiceView,
     DistributorListView,
     DistributorManageView,
@@ -22,6 +25,8 @@ from .views import (
     ProductDetailsAjaxView,
     CustomerOrderHistoryView,
     ShipmentTrackingView,
+    BulkOrderStatusView,
+    RequestTimingsView,
     SignupView, LoginView, LogoutView, ForgotPasswordView
     )
 '''RegisterView, LoginView, logout_view, check_email_exists_ajax'''
@@ -55,7 +60,10 @@ urlpatterns = [
     # inventory
     path("inventory/", InventoryDashboardView.as_view(), name="inventory_dashboard",),
     path("inventory/raw/<str:material_id>/convert/",ConvertRawToFinishedView.as_view(),name="convert_to_finished"),
+    path("inventory/convert/", BatchConvertView.as_view(), name="batch_convert"),
     path('inventory/upload/', UploadInventoryFileView.as_view(), name='upload_inventory_file'),
+    path('inventory/upload/sign/', InventoryUploadSignView.as_view(), name='sign_inventory_upload'),
+    path('inventory/upload/complete/', InventoryUploadCompleteView.as_view(), name='complete_inventory_upload'),
     path('inventory/delete_invoice/', DeleteInvoiceView.as_view(), name='delete_invoice'),
     
     # distributor orders
@@ -73,6 +81,12 @@ urlpatterns = [
     path("customer/orders/history/", CustomerOrderHistoryView.as_view(), name="customer_order_history"),
     
     path("shipment-tracking/<str:shipment_id>/", ShipmentTrackingView.as_view(), name="shipment_tracking"),
+
+    # bulk status changes (purchase / distributor / customer)
+    path("orders/<str:kind>/bulk-status/", BulkOrderStatusView.as_view(), name="bulk_order_status"),
+
+    # per-request timing breakdowns recorded by RequestTimingMiddleware
+    path("debug/timings/", RequestTimingsView.as_view(), name="request_timings"),
     
     path("signup/", SignupView.as_view(), name="signup"),
     path("login/", LoginView.as_view(), name="login"),
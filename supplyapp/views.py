@@ -1,5 +1,6 @@
 from decimal import Decimal
-import uuid, boto3
+import json
+import uuid
 from uuid import uuid4
 from datetime import datetime
 from django.utils import timezone
@@ -10,17 +11,25 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
 from .models import PurchaseOrderHistory, DistributorOrderHistory, CustomerOrderHistory
 from .services import CognitoService
+from .cache import reference_cache
+from .stores import batch_get_items, iter_table, query_for_distributor, scan_all, sum_attribute
+from .concurrency import Call, FanOutTimeout, gather
+from .timing_middleware import recent_timings
+from .cognito_tokens import InvalidToken, store_tokens
+from .invoices import invoice_catalog, presigned_urls
+from .aws import aws
+from .outbox import enqueue_notification
+from . import dashboard, idempotency
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.timezone import now
-import os, boto3
+from django.utils.dateparse import parse_date
+from botocore.exceptions import BotoCoreError, ClientError
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.conf import settings
-from django.core.files.storage import default_storage
+from django.db import transaction
 from django.utils.timezone import now
 
-from supplychainlib.aws_lambda import LambdaInvoker
-from supplychainlib.aws_s3 import S3Manager
 from supplychainlib.aws_sns import SNSManager
 
 from supplychainlib.aws_dynamodb import (
@@ -36,25 +45,46 @@ from supplychainlib.aws_dynamodb import (
 from supplychainlib.utility import InventoryUtility
 from .services import (
     SupplierService,
+    SupplierLookupService,
     RawMaterialService,
     PurchaseOrderService,PurchaseOrderHistoryService,
     FinishedProductService,
-    DistributorOrderService, DistributorOrderHistoryService, CustomerOrderHistoryService
+    DistributorOrderService, DistributorOrderHistoryService, CustomerOrderHistoryService,
+    InventoryLedger, InsufficientStockError, BulkOrderStatusService, ConversionService,
 )
 
 # -------------------------------------------------------------------
 # Service wiring
 # -------------------------------------------------------------------
 
-supplier_service = SupplierService(SupplierManager())
-raw_service = RawMaterialService(RawMaterialManager())
-po_service = PurchaseOrderService(PurchaseOrderManager(), raw_service)
-fp_service = FinishedProductService(FinishedProductManager(), raw_service)
-dist_order_service = DistributorOrderService(
-    DistributorOrderManager(),
-    DistributorInventoryManager(),
-    FinishedProductManager(),
-)
+# Services are built per call from the registry's per-thread managers, so
+# every request uses the pooled clients (and is timed) without import-time
+# AWS setup.
+
+def supplier_service():
+    return SupplierService(aws.manager(SupplierManager))
+
+
+def raw_service():
+    return RawMaterialService(aws.manager(RawMaterialManager))
+
+
+def po_service():
+    return PurchaseOrderService(
+        aws.manager(PurchaseOrderManager), raw_service(), SupplierLookupService(aws.manager(SupplierManager))
+    )
+
+
+def fp_service():
+    return FinishedProductService(aws.manager(FinishedProductManager), raw_service())
+
+
+def dist_order_service():
+    return DistributorOrderService(
+        aws.manager(DistributorOrderManager),
+        aws.manager(DistributorInventoryManager),
+        aws.manager(FinishedProductManager),
+    )
 
 FINISHED_PRODUCT_PRICES = {
             "Espresso Blend": 30.0,
@@ -69,31 +99,22 @@ FINISHED_PRODUCT_PRICES = {
 class DashboardView(View):
     def get(self, request):
 
-        suppliers = supplier_service.list_active()
-        raw_items = raw_service.manager.scan()
-        finished_items = fp_service.manager.scan()
-        purchase_orders = PurchaseOrderHistory.objects.all()
-
-        distributor_manager = DistributorManager()
-        distributors = distributor_manager.scan()
-        distributor_count = len(distributors)
-
-        # FIX — replace broken service call with ORM
-        distributor_orders = DistributorOrderHistory.objects.all()
-        distributor_order_count = distributor_orders.count()
-
-        # FIX — customer orders counted from ORM
-        customer_order_count = CustomerOrderHistory.objects.count()
-
-        context = {
-            "supplier_count": len(suppliers),
-            "po_count": purchase_orders.count(),
-            "inventory_count": sum(int(i.get("quantity", 0)) for i in raw_items),
-            "finished_count": sum(int(i.get("quantity", 0)) for i in finished_items),
-            "order_count": distributor_order_count,
-            "distributor_count": distributor_count,
-            "customer_order_count": customer_order_count,
-        }
+        # Counters are kept up to date by the write paths and periodically
+        # rebuilt by the reconcile_dashboard command.
+        try:
+            summary = dashboard.get_summary()
+        except (ClientError, BotoCoreError, FanOutTimeout) as e:
+            # First load and DynamoDB is unreachable or too slow: no figures to show
+            print(f"Dashboard reconcile failed: {e}")
+            return render(request, "supplyapp/dashboard.html", {
+                "summary_error": "Dashboard figures are unavailable right now. Please try again shortly.",
+            })
+        context = {name: getattr(summary, name) for name in dashboard.COUNTERS}
+        context.update({
+            "summary_updated_at": summary.updated_at,
+            "summary_reconciled_at": summary.reconciled_at,
+            "summary_stale": dashboard.is_stale(summary),
+        })
 
         return render(request, "supplyapp/dashboard.html", context)
 
@@ -106,7 +127,7 @@ class SupplierBase(View):
     table_name = "Suppliers"
 
     def get_table(self):
-        return DynamoDBManager(self.table_name)
+        return aws.manager(DynamoDBManager, self.table_name)
 
 
 class SupplierListView(SupplierBase):
@@ -149,7 +170,23 @@ class SupplierManagerView(SupplierBase):
                 "active": True,
             }
 
-            table.put_item(item)
+            created = False
+            if action == "add":
+                # Only a put that creates the item is a new supplier; an
+                # existing id is overwritten like an edit and not counted.
+                try:
+                    table.table.put_item(Item=item, ConditionExpression="attribute_not_exists(id)")
+                    created = True
+                except ClientError as e:
+                    if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                        print(f"Error adding supplier {sup_id}: {e}")
+                        messages.error(request, "Error adding supplier. Please try again.")
+                        return redirect("supplier_list")
+            if not created:
+                table.put_item(item)
+            reference_cache.invalidate("Suppliers", sup_id)
+            if created:
+                dashboard.record(supplier_count=1)
             messages.success(
                 request,
                 f"Supplier {'added' if action == 'add' else 'updated'} successfully.",
@@ -164,7 +201,10 @@ class SupplierManagerView(SupplierBase):
                     return redirect("supplier_list")
 
                 key = {"id": str(sup_id).strip()}
-                table.delete_item(key)
+                deleted = table.table.delete_item(Key=key, ReturnValues="ALL_OLD").get("Attributes")
+                reference_cache.invalidate("Suppliers", key["id"])
+                if deleted:
+                    dashboard.record(supplier_count=-1)
                 messages.success(request, "Supplier deleted successfully.")
             except Exception as exc:
                 messages.error(request, f"Error deleting supplier: {exc}")
@@ -182,12 +222,7 @@ class RawMaterialBySupplierView(View):
 
     def get(self, request, supplier_id):
         try:
-            table = DynamoDBManager("Suppliers")
-            all_suppliers = table.scan_table()
-
-            selected_supplier = next(
-                (s for s in all_suppliers if s.get("id") == supplier_id), None
-            )
+            selected_supplier = reference_cache.get("Suppliers", supplier_id)
 
             if not selected_supplier:
                 return JsonResponse({"raw_materials": []})
@@ -209,11 +244,11 @@ class RawMaterialBySupplierView(View):
 # -------------------------------------------------------------------
 class PurchaseOrderFormView(View):
     def get(self, request):
-        suppliers = supplier_service.list_active()
+        suppliers = supplier_service().list_active()
         return render(
             request,
             "supplyapp/purchase_order_form.html",
-            {"suppliers": suppliers},
+            {"suppliers": suppliers, "idempotency_key": idempotency.issue()},
         )
 
     def post(self, request):
@@ -223,18 +258,17 @@ class PurchaseOrderFormView(View):
         delivery_date = request.POST.get("delivery_date")
 
         try:
-            po_service.create(supplier_id, material_id, quantity, delivery_date)
-            messages.success(request, "Purchase order created.")
-
-            # Trigger Lambda
-            purchase_order = {
-                "supplier_id": supplier_id,
-                "material_id": material_id,
-                "quantity": quantity,
-                "delivery_date": delivery_date
-            }
-            invoker = LambdaInvoker(region_name="us-east-1")
-            lambda_response = invoker.invoke_function('GenerateInvoiceLambda', purchase_order)
+            # create() also queues the invoice Lambda for this PO; a resubmitted
+            # form replays the first result instead of creating another PO
+            _, replayed = idempotency.run_once(
+                request.POST.get(idempotency.FORM_FIELD),
+                "purchase_order",
+                lambda: po_service().create(supplier_id, material_id, quantity, delivery_date)["po_id"],
+            )
+            if replayed:
+                messages.info(request, "This purchase order was already submitted.")
+            else:
+                messages.success(request, "Purchase order created.")
         except Exception as exc:
             messages.error(request, str(exc))
 
@@ -244,17 +278,23 @@ class PurchaseOrderFormView(View):
 
 class PurchaseOrderHistoryView(View):
     def get(self, request):
-        orders = PurchaseOrderHistoryService().list_all()
-        supplier_service = SupplierService(SupplierManager())
-        suppliers = {s["id"]: s.get("name", "") for s in supplier_service.list_active()}
-        raw_service = RawMaterialService(RawMaterialManager())
-        raw_materials = {r["id"]: r.get("name", "") for r in raw_service.manager.scan()}  # <-- Corrected
+        page = PurchaseOrderHistoryService().list_page(
+            request.GET.get("cursor"), request.GET.get("page_size")
+        )
+        orders = page.items
+        found = reference_cache.get_many("Suppliers", {o.supplier_id for o in orders})
+        suppliers = {sid: s.get("name", "") for sid, s in found.items()}
+
+        # Older orders were saved without a material name; read just those by key
+        missing = {o.raw_material for o in orders if not o.raw_material_name}
+        found = batch_get_items(raw_service().manager, "id", missing) if missing else {}
+        raw_materials = {mid: m.get("name", "") for mid, m in found.items()}
 
         for o in orders:
             o.supplier_name = suppliers.get(o.supplier_id, "—")
-            o.raw_material_name = getattr(o, "raw_material_name", None) or raw_materials.get(o.raw_material_id, "—")
+            o.raw_material_name = o.raw_material_name or raw_materials.get(o.raw_material, "—")
 
-        return render(request, "supplyapp/purchase_order_history.html", {"orders": orders})
+        return render(request, "supplyapp/purchase_order_history.html", {"orders": orders, "page": page})
 
 class PO_StatusView(View):
     def post(self, request, po_id):
@@ -275,7 +315,7 @@ class PO_StatusView(View):
         if new_status == "Delivered":
             raw_material_id = po.raw_material  # your models field, should match manager id
             quantity = int(po.quantity)
-            raw_service.changequantity(raw_material_id, quantity)
+            raw_service().changequantity(raw_material_id, quantity)
             messages.success(request, f"Order {po_id} marked as Delivered. Inventory updated in DynamoDB.")
 
         else:
@@ -286,27 +326,23 @@ class PO_StatusView(View):
 # -------------------------------------------------------------------
 # Inventory / finished products
 # -------------------------------------------------------------------
-def list_invoices_s3():
-    # List all invoice files in the S3 bucket under the "inventory/" prefix.
-    s3 = boto3.client('s3')
-    bucket = settings.AWS_S3_BUCKET_NAME
-    prefix = "inventory/"
-    files = s3.list_objects_v2(Bucket=bucket, Prefix=prefix)
-    result = []
-    for obj in files.get('Contents', []):
-        key = obj['Key']
-        if key != prefix:  # Avoid directory entry
-            result.append({
-                'name': key.split('/')[-1],  # just filename, for display
-                'key': key,                  # full S3 object key, for download/delete
-                'url': f"https://{bucket}.s3.amazonaws.com/{key}"
-            })
-    return result 
+def _date_param(request, name):
+    try:
+        return parse_date(request.GET.get(name, ""))
+    except ValueError:
+        return None
 
 class InventoryDashboardView(View):
     def get(self, request):
-        raw_items_full = raw_service.manager.scan()
-        finished_items = fp_service.manager.scan()
+        inventory_error = None
+        try:
+            raw_items_full = scan_all(raw_service().manager.table.name)
+            finished_total = sum_attribute(fp_service().manager.table.name, "quantity")
+        except (ClientError, BotoCoreError, FanOutTimeout) as e:
+            # A partial scan would show wrong totals; show none instead
+            print(f"Error reading inventory: {e}")
+            inventory_error = "Inventory could not be read right now. Please try again shortly."
+            raw_items_full, finished_total = [], None
 
         # Raw Materials: Only show delivered in-stock (quantity > 0)
         raw_items = [i for i in raw_items_full if int(i.get("quantity", 0)) > 0]
@@ -315,114 +351,153 @@ class InventoryDashboardView(View):
             if int(i.get("quantity", 0)) == 0 and i.get("delivered", True)
         ]
 
-        raw_total = sum(int(i.get("quantity", 0)) for i in raw_items)
-        finished_total = sum(int(i.get("quantity", 0)) for i in finished_items)
+        raw_total = None if inventory_error else sum(int(i.get("quantity", 0)) for i in raw_items)
 
-        invoices = []
-        try:
-            files = s3.list_objects("invoices/purchase_orders/")
-            for f in files:
-                invoices.append({
-                    "name": f.split("/")[-1],
-                    "url": f"https://{s3.bucket_name}.s3.amazonaws.com/{f}"
-                })
-        except Exception as e:
-            print(f"S3 list error: {e}")
+        # Served from the cached manifest; S3 is listed at most once per TTL
+        filters = {
+            "prefix": request.GET.get("invoice_prefix", "").strip(),
+            "since": _date_param(request, "invoice_from"),
+            "until": _date_param(request, "invoice_to"),
+        }
+        invoices, next_cursor = invoice_catalog.page(
+            cursor=request.GET.get("invoice_cursor"), **filters
+        )
+        params = request.GET.copy()
+        params.pop("invoice_cursor", None)
+        first_query = params.urlencode()
+        next_query = None
+        if next_cursor:
+            params["invoice_cursor"] = next_cursor
+            next_query = params.urlencode()
 
         context = {
+            "inventory_error": inventory_error,
             "raw_total": raw_total,
             "finished_total": finished_total,
             "low_stock_items": low_stock,
             "raw_items": raw_items,
+            "blends": sorted(reference_cache.names("Recipes")),
             "invoices": invoices,
+            "invoice_filters": filters,
+            "invoice_next_query": next_query,
+            "invoice_first_query": first_query if request.GET.get("invoice_cursor") else None,
         }
-        context["invoices"] = list_invoices_s3()
         return render(request, "supplyapp/inventory_dashboard.html", context)
 
 class ConvertRawToFinishedView(View):
     def post(self, request, material_id):
+        blend_name = request.POST.get("blend_name")
         try:
-            valid_blends = ["Roasted Beans", "Espresso Blend"]
-            blend_name = request.POST.get("blend_name")  # NEW: get selected product
-            if blend_name not in valid_blends:
-                messages.error(request, "Invalid blend selected.")
-                return redirect("inventory_dashboard")
-            material = next(
-                (m for m in raw_service.manager.scan() if m.get("id") == material_id),
-                None
-            )
-
-            if not material:
-                messages.error(request, "Raw material not found.")
-                return redirect("inventory_dashboard")
+            # Converts all of the material the blend's recipe allows
+            result = ConversionService().convert([(material_id, blend_name, None)])[0]
+        except ValueError as e:
+            messages.error(request, f"Conversion failed: {e}")
+            return redirect("inventory_dashboard")
+        except (ClientError, BotoCoreError) as e:
+            print(f"Error converting {material_id} to {blend_name}: {e}")
+            messages.error(request, "Conversion failed: inventory could not be updated. Please try again.")
+            return redirect("inventory_dashboard")
 
-            quantity = int(material.get("quantity", 0))
-            if quantity < 4:
-                messages.warning(request, "At least 4 units of raw material required to convert (4 raw = 1 finished).")
-                return redirect("inventory_dashboard")
+        if not result["units"]:
+            messages.warning(request, f"Not enough raw material to make one unit of {blend_name}.")
+        else:
+            messages.success(request, f"Converted {result['raw_used']} raw units to {result['units']} {blend_name}(s).")
+        return redirect("inventory_dashboard")
 
-            finished_units = quantity // 4
-            remaining_raw = quantity % 4
+class BatchConvertView(View):
+    """
+    Several raw-to-finished conversions applied in one transaction.
 
-            # Update the raw material quantity
-            raw_service.manager.update_item(
-                key={"id": material_id},
-                update_expr="SET quantity = :q",
-                values={":q": remaining_raw}
-            )
+    POST a JSON body ``{"conversions": [{"material_id": ..., "blend_name":
+    ..., "units": ...}]}`` (``units`` optional: all available stock) or
+    repeated ``material_id`` / ``blend_name`` / ``units`` form fields.
+    """
 
-            unit_price = FINISHED_PRODUCT_PRICES.get(blend_name, 0.0)
-            finished_items = fp_service.manager.scan()
-            match = next((fp for fp in finished_items if fp.get("blend_name") == blend_name), None)
-            finished_key = "finished_id"
-
-            if match:
-                existing_qty = int(match.get("quantity", 0))
-                fp_service.manager.update_item(
-                    key={finished_key: match[finished_key]},
-                    update_expr="SET quantity = :q",
-                    values={":q": existing_qty + finished_units}
-                )
-            else:
-                new_finished = {
-                    finished_key: str(uuid.uuid4()),
-                    "blend_name": blend_name,
-                    "quantity": finished_units,
-                    "unit_price": unit_price,
-                }
-                fp_service.manager.put_item(new_finished)
+    def post(self, request):
+        if request.content_type == "application/json":
+            try:
+                payload = json.loads(request.body or b"{}")
+            except ValueError:
+                return JsonResponse({"error": "Invalid JSON body."}, status=400)
+            if not isinstance(payload, dict):
+                return JsonResponse({"error": "Expected a JSON object."}, status=400)
+            rows = payload.get("conversions") or []
+        else:
+            units = request.POST.getlist("units")
+            rows = [
+                {"material_id": m, "blend_name": b, "units": units[n] if n < len(units) else None}
+                for n, (m, b) in enumerate(zip(request.POST.getlist("material_id"), request.POST.getlist("blend_name")))
+            ]
 
-            messages.success(request, f"Converted {finished_units * 4} raw units to {finished_units} {blend_name}(s).")
-        except Exception as e:
-            messages.error(request, f"Conversion failed: {e}")
+        try:
+            conversions = [
+                (row["material_id"], row["blend_name"], int(row["units"]) if row.get("units") not in (None, "") else None)
+                for row in rows
+            ]
+        except (KeyError, TypeError, ValueError):
+            return JsonResponse({"error": "Each conversion needs material_id, blend_name and optional integer units."}, status=400)
+        if not conversions:
+            return JsonResponse({"error": "No conversions given."}, status=400)
 
-        return redirect("inventory_dashboard")
+        try:
+            results = ConversionService().convert(conversions)
+        except InsufficientStockError as exc:
+            return JsonResponse({"error": str(exc)}, status=409)
+        except ValueError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+        except (ClientError, BotoCoreError) as exc:
+            print(f"Error applying batch conversion: {exc}")
+            return JsonResponse({"error": "Inventory could not be updated. Please try again."}, status=503)
+        return JsonResponse({"conversions": results})
 
    
 class UploadInventoryFileView(View):
+    """
+    Fallback for browsers without JavaScript: the upload is streamed on to
+    S3 from Django's upload handler, without a second copy on local disk.
+    The dashboard normally uploads straight to S3 (see the views below).
+    """
+
     def post(self, request):
         file_obj = request.FILES.get("file")
         if not file_obj:
             messages.error(request, "Please select a file to upload.")
             return redirect("inventory_dashboard")
 
-        temp_path = default_storage.save(file_obj.name, file_obj)
-        temp_file_path = os.path.join(settings.MEDIA_ROOT, temp_path)
-
-        timestamp = now().strftime("%Y%m%d_%H%M%S")
-        s3_key = f"inventory/{timestamp}_{file_obj.name}"
-
+        s3_key = invoice_catalog.upload_key(file_obj.name)
         try:
-            s3 = S3Manager(settings.AWS_S3_BUCKET_NAME)
-            s3.upload_file(temp_file_path, s3_key)
+            s3 = aws.s3_manager(settings.AWS_S3_BUCKET_NAME)
+            s3.upload_fileobj(file_obj, s3_key)
+            invoice_catalog.invalidate()
             messages.success(request, "Inventory file uploaded successfully.")
         except Exception as exc:
             messages.error(request, f"Error uploading file: {exc}")
 
-        default_storage.delete(temp_path)
-
         return redirect("inventory_dashboard")
 
+class InventoryUploadSignView(View):
+    """Presigned POST for uploading one inventory file directly to S3."""
+
+    def post(self, request):
+        filename = request.POST.get("filename", "").strip()
+        if not filename:
+            return JsonResponse({"error": "filename is required."}, status=400)
+        try:
+            return JsonResponse(invoice_catalog.presigned_upload(filename))
+        except (ClientError, BotoCoreError) as exc:
+            print(f"Error signing inventory upload: {exc}")
+            return JsonResponse({"error": "Could not start the upload."}, status=502)
+
+class InventoryUploadCompleteView(View):
+    """Completion callback: registers a file the browser uploaded to S3."""
+
+    def post(self, request):
+        entry = invoice_catalog.register_upload(request.POST.get("key", ""))
+        if entry is None:
+            return JsonResponse({"error": "Upload not found."}, status=404)
+        messages.success(request, "Inventory file uploaded successfully.")
+        return JsonResponse({"key": entry["key"], "name": entry["name"], "size": entry["size"]})
+
 class DeleteInvoiceView(View):
     def post(self, request):
         # Retrieve the full S3 key from the POST request
@@ -431,8 +506,10 @@ class DeleteInvoiceView(View):
             messages.error(request, "No invoice file specified for deletion.")
             return redirect("inventory_dashboard")
         try:
-            s3 = S3Manager(settings.AWS_S3_BUCKET_NAME)
+            s3 = aws.s3_manager(settings.AWS_S3_BUCKET_NAME)
             s3.delete_file(file_key)  # This expects the full S3 key, not just the filename
+            invoice_catalog.invalidate()
+            presigned_urls.invalidate(file_key)
             messages.success(request, "Invoice file deleted.")
         except Exception as exc:
             messages.error(request, f"Error deleting file: {exc}")
@@ -444,18 +521,17 @@ class DeleteInvoiceView(View):
 
 class DistributorListView(View):
     def get(self, request):
-        manager = DistributorManager()
-        distributors = [d for d in manager.scan() if d.get("active", True)]
+        distributors = [d for d in reference_cache.all("Distributors") if d.get("active", True)]
         return render(request, "supplyapp/distributor_list.html", {"distributors": distributors})
 
 class DistributorManageView(View):
     def get(self, request, distributor_id=None):
-        manager = DistributorManager()
+        manager = aws.manager(DistributorManager)
         distributor = manager.get_item({"id": distributor_id}) if distributor_id else None
         return render(request, "supplyapp/distributor_manage.html", {"distributor": distributor})
 
     def post(self, request, distributor_id=None):
-        manager = DistributorManager()
+        manager = aws.manager(DistributorManager)
         action = request.POST.get("action", "add").lower()
         name = request.POST.get("name", "").strip()
         region = request.POST.get("region", "").strip()
@@ -465,6 +541,8 @@ class DistributorManageView(View):
         # Handle deletion
         if action == "delete" and distributor_id:
             manager.delete_item({"id": distributor_id})
+            reference_cache.invalidate("Distributors", distributor_id)
+            dashboard.record(distributor_count=-1)
             messages.success(request, "Distributor deleted successfully.")
             return redirect("distributor_list")
 
@@ -476,7 +554,7 @@ class DistributorManageView(View):
 
         # Prevent duplicate entries only for add (not for edit)
         if not distributor_id:
-            all_distributors = manager.scan()
+            all_distributors = iter_table(manager.table, projection=["name"])
             duplicate = any(
                 d.get("name", "").strip().lower() == name.lower()
                 for d in all_distributors
@@ -494,22 +572,27 @@ class DistributorManageView(View):
             "active": active,
         }
         manager.put_item(item)
+        reference_cache.invalidate("Distributors", dist_id)
+        if not distributor_id:
+            dashboard.record(distributor_count=1)
         messages.success(request, f"Distributor {'added' if not distributor_id else 'updated'} successfully.")
         return redirect("distributor_list")
 class DistributorOrderFormView(View):
     def get(self, request):
-        manager = DistributorManager()
-        distributors = [d for d in manager.scan() if d.get("active")]
-        finished_manager = FinishedProductManager()
+        distributors = [d for d in reference_cache.all("Distributors") if d.get("active")]
+        finished_manager = aws.manager(FinishedProductManager)
+        in_stock = [fp for fp in iter_table(finished_manager.table) if int(fp.get("quantity", 0)) > 0]
+        # Prices come from the recipes, read by blend name (cached)
+        recipes = reference_cache.get_many("Recipes", [fp.get("blend_name") for fp in in_stock])
         finished_products = []
-        for fp in finished_manager.scan():
-            if int(fp.get("quantity", 0)) > 0:
-                price = FINISHED_PRODUCT_PRICES.get(fp.get("blend_name"), 0)
-                finished_products.append({
-                    "id": fp.get("finished_id"),
-                    "blend_name": fp.get("blend_name"),
-                    "unit_price": price,
-                })
+        for fp in in_stock:
+            recipe = recipes.get(fp.get("blend_name"))
+            price = float(recipe["unit_price"]) if recipe else FINISHED_PRODUCT_PRICES.get(fp.get("blend_name"), 0)
+            finished_products.append({
+                "id": fp.get("finished_id"),
+                "blend_name": fp.get("blend_name"),
+                "unit_price": price,
+            })
 
         return render(
             request,
@@ -517,6 +600,7 @@ class DistributorOrderFormView(View):
             {
                 "distributors": distributors,
                 "finished_products": finished_products,
+                "idempotency_key": idempotency.issue(),
             }
         )
 
@@ -527,65 +611,67 @@ class DistributorOrderFormView(View):
         delivery_date = request.POST.get("delivery_date")
         order_date = datetime.strptime(delivery_date, "%Y-%m-%d").date() if delivery_date else now().date()
         status = "Processing"
-    
-        DistributorOrderHistory.objects.create(
-            order_id=str(uuid.uuid4()),
-            distributor_id=distributor_id,
-            product_id=product_id,
-            quantity=quantity,
-            status=status,
-            order_date=order_date
+
+        def create_order():
+            order = DistributorOrderHistory.objects.create(
+                order_id=str(uuid.uuid4()),
+                distributor_id=distributor_id,
+                product_id=product_id,
+                quantity=quantity,
+                status=status,
+                order_date=order_date
+            )
+            dashboard.record(order_count=1)
+            return order.order_id
+
+        _, replayed = idempotency.run_once(
+            request.POST.get(idempotency.FORM_FIELD), "distributor_order", create_order
         )
-        messages.success(request, "Distributor order created.")
+        if replayed:
+            messages.info(request, "This distributor order was already submitted.")
+        else:
+            messages.success(request, "Distributor order created.")
         return redirect("distributor_order_history")
 
 class ChangeDistributorOrderStatusView(View):
     def post(self, request, order_id):
         new_status = request.POST.get("status")
         try:
-            order = DistributorOrderHistory.objects.get(order_id=order_id)
-            order.status = new_status
-            order.save()
-
-            if new_status == "Delivered":
-                distributor_id = order.distributor_id
-                product_id = order.product_id
-                quantity = int(order.quantity)
-
-                # Update distributor inventory in DynamoDB
-                distributor_inventory = DistributorInventoryManager()
-                # ---- Robust logic: add or update stock correctly ----
-                inv_id = f"{distributor_id}#{product_id}"  # Use as single PK
-                key = {"id": inv_id}
-                existing = distributor_inventory.get_item(key)
-                if existing and existing.get("quantity") is not None:
-                    new_qty = int(existing["quantity"]) + quantity
-                    distributor_inventory.update_item(
-                        key=key,
-                        update_expr="SET quantity = :q",
-                        values={":q": new_qty}
-                    )
+            # The row lock serialises concurrent deliveries of the same order,
+            # so the Delivered check and the stock move happen at most once.
+            with transaction.atomic():
+                order = DistributorOrderHistory.objects.select_for_update().get(order_id=order_id)
+
+                if new_status == "Delivered" and order.status != "Delivered":
+                    distributor_id = order.distributor_id
+                    product_id = order.product_id
+                    quantity = int(order.quantity)
+
+                    # Take stock from the central finished-product counter first;
+                    # this is conditional and fails without side effects if short.
+                    finished_ledger = InventoryLedger(aws.manager(FinishedProductManager), "finished_id")
+                    finished_ledger.remove(product_id, quantity)
+
+                    distributor_ledger = InventoryLedger(aws.manager(DistributorInventoryManager))
+                    try:
+                        distributor_ledger.add(f"{distributor_id}#{product_id}", quantity, {
+                            "distributor_id": distributor_id,
+                            "product_id": product_id,
+                        })
+                    except Exception:
+                        finished_ledger.add(product_id, quantity)
+                        raise
+
+                    order.status = new_status
+                    order.save()
+                    dashboard.record(finished_count=-quantity)
+                    messages.success(request, f"Order {order_id} marked as Delivered. Inventory updated.")
                 else:
-                    distributor_inventory.put_item({ "id": inv_id,
-                        "distributor_id": distributor_id,
-                        "product_id": product_id,
-                        "quantity": quantity
-                    })
-
-                # Decrement finished product central stock
-                finished_manager = FinishedProductManager()
-                product = finished_manager.get_item({"finished_id": product_id})
-                if product:
-                    current_qty = int(product.get("quantity", 0))
-                    updated_qty = max(0, current_qty - quantity)
-                    finished_manager.update_item(
-                        key={"finished_id": product_id},
-                        update_expr="SET quantity = :q",
-                        values={":q": updated_qty}
-                    )
-                messages.success(request, f"Order {order_id} marked as Delivered. Inventory updated.")
-            else:
-                messages.success(request, f"Order {order_id} status updated to {new_status}.")
+                    order.status = new_status
+                    order.save()
+                    messages.success(request, f"Order {order_id} status updated to {new_status}.")
+        except InsufficientStockError as exc:
+            messages.error(request, f"Cannot deliver order {order_id}: {exc}")
         except Exception as exc:
             messages.error(request, f"Error: {exc}")
         return redirect("distributor_order_history")
@@ -593,25 +679,28 @@ class ChangeDistributorOrderStatusView(View):
 
 class DistributorOrderHistoryView(View):
     def get(self, request):
-        orders = DistributorOrderHistoryService().list_all()
-        manager = DistributorManager()
-        distributors = {d["id"]: d.get("name", "") for d in manager.scan()}
-        products = {p.get("finished_id"): p.get("blend_name", "") for p in FinishedProductManager().scan()}
+        page = DistributorOrderHistoryService().list_page(
+            request.GET.get("cursor"), request.GET.get("page_size")
+        )
+        orders = page.items
+        distributors, products = gather(
+            Call(reference_cache.names, "Distributors", default={}),
+            Call(reference_cache.names, "FinishedProducts", default={}),
+        )
 
         for o in orders:
             o.distributor_name = distributors.get(o.distributor_id, "—")
             o.product_name = products.get(o.product_id, "—")
 
-        return render(request, "supplyapp/distributor_order_history.html", {"orders": orders})
+        return render(request, "supplyapp/distributor_order_history.html", {"orders": orders, "page": page})
 
 class DistributorInventoryView(View):
     def get(self, request):
-        distributors = DistributorManager().scan()
-        all_distributors = {d["id"]: d.get("name", "") for d in distributors}
-        finished_products = FinishedProductManager().scan()
-        products = {p.get("finished_id"): p.get("blend_name", "") for p in finished_products}
-
-        inventory_records = DistributorInventoryManager().scan()
+        all_distributors, products, inventory_records = gather(
+            Call(reference_cache.names, "Distributors", default={}),
+            Call(reference_cache.names, "FinishedProducts", default={}),
+            lambda: list(iter_table(aws.manager(DistributorInventoryManager).table)),
+        )
         stock_table = self.aggregate_inventory(inventory_records)
 
         table = []
@@ -651,7 +740,7 @@ class DistributorInventoryView(View):
 
 class CustomerOrderFormView(View):
     def get(self, request):
-        distributors = [d for d in DistributorManager().scan() if d.get("active")]
+        distributors = [d for d in reference_cache.all("Distributors") if d.get("active")]
         selected_dist_id = request.GET.get("distributor") or ""
         user_email = request.session.get("user_email", "")
         customer_name = request.GET.get("customer_name", "")
@@ -659,30 +748,27 @@ class CustomerOrderFormView(View):
         address = request.GET.get("address", "")
 
         finished_products = []
+        inventory_error = None
 
         if selected_dist_id:
-            inventory_records = DistributorInventoryManager().scan()
+            try:
+                inventory_records = query_for_distributor(
+                    aws.manager(DistributorInventoryManager), selected_dist_id
+                )
+            except (ClientError, BotoCoreError) as e:
+                # Partial stock would offer the wrong products; offer none
+                print(f"Error reading inventory for distributor {selected_dist_id}: {e}")
+                inventory_error = "Distributor inventory is unavailable right now. Please try again shortly."
+                inventory_records = []
 
             product_stock = {}
             for inv in inventory_records:
-                dist_id = inv.get("distributor_id")
                 prod_id = inv.get("product_id")
-
-                # Fallback for composite primary key in "id"
-                if not dist_id or not prod_id:
-                    inv_id = inv.get("id", "")
-                    parts = inv_id.split("#")
-                    if len(parts) == 2:
-                        dist_id, prod_id = parts
-
-                if not dist_id or not prod_id:
-                    continue
-
                 qty = int(inv.get("quantity", 0))
-                if dist_id == selected_dist_id and qty > 0:
+                if prod_id and qty > 0:
                     product_stock[prod_id] = product_stock.get(prod_id, 0) + qty
 
-            all_products = FinishedProductManager().scan()
+            all_products = reference_cache.all("FinishedProducts")
             for p in all_products:
                 prod_id = p.get("finished_id")
                 if prod_id in product_stock:
@@ -700,6 +786,8 @@ class CustomerOrderFormView(View):
             "quantity": quantity,
             "address": address,
             "finished_products": finished_products,
+            "inventory_error": inventory_error,
+            "idempotency_key": idempotency.issue(),
         }
         return render(request, "supplyapp/customer_order_form.html", context)
 
@@ -718,17 +806,12 @@ class CustomerOrderFormView(View):
         except (TypeError, ValueError):
             quantity = 0
         
-        distributor_name = ""
-        for d in DistributorManager().scan():
-            if d.get("id") == distributor_id:
-                distributor_name = d.get("name", "")
-                break
-
-        product_name = ""
-        for p in FinishedProductManager().scan():
-            if p.get("finished_id") == product_id:
-                product_name = p.get("blend_name", "")
-                break
+        found = reference_cache.resolve({
+            "Distributors": [distributor_id],
+            "FinishedProducts": [product_id],
+        })
+        distributor_name = found["Distributors"].get(distributor_id, {}).get("name", "")
+        product_name = found["FinishedProducts"].get(product_id, {}).get("blend_name", "")
 
         # Simple validation
         if not (customer_name and distributor_name and product_name and quantity > 0 and address):
@@ -736,21 +819,30 @@ class CustomerOrderFormView(View):
             return redirect("customer_order_form")
 
         # Save order to history
-        order = CustomerOrderHistory.objects.create(
-            order_id=str(uuid.uuid4()),
-            customer_name=customer_name,
-            distributor_id=distributor_id,
-            distributor_name=distributor_name,
-            product_id=product_id,
-            product_name=product_name,            
-            quantity=quantity,
-            address=address,
-            status="Processing",
-            tracking_link="",
-            order_date=timezone.now().date()
-        )
+        def create_order():
+            order = CustomerOrderHistory.objects.create(
+                order_id=str(uuid.uuid4()),
+                customer_name=customer_name,
+                distributor_id=distributor_id,
+                distributor_name=distributor_name,
+                product_id=product_id,
+                product_name=product_name,
+                quantity=quantity,
+                address=address,
+                status="Processing",
+                tracking_link="",
+                order_date=timezone.now().date()
+            )
+            dashboard.record(customer_order_count=1)
+            return order.order_id
 
-        messages.success(request, "Customer order placed successfully.")
+        _, replayed = idempotency.run_once(
+            request.POST.get(idempotency.FORM_FIELD), "customer_order", create_order
+        )
+        if replayed:
+            messages.info(request, "This order was already placed.")
+        else:
+            messages.success(request, "Customer order placed successfully.")
         return redirect("customer_order_form")
 
 
@@ -758,7 +850,7 @@ class ProductDetailsAjaxView(View):
     def get(self, request):
         product_id = request.GET.get("product_id")
 
-        product = FinishedProductManager().get_item({"finished_id": product_id})
+        product = aws.manager(FinishedProductManager).get_item({"finished_id": product_id})
         if not product:
             return JsonResponse({"error": "Not found"}, status=404)
 
@@ -766,9 +858,11 @@ class ProductDetailsAjaxView(View):
         distributor_id = request.GET.get("distributor_id")
 
         stock = 0
-        inventory_items = DistributorInventoryManager().scan()
-        for inv in inventory_items:
-            if inv.get("distributor_id") == distributor_id and inv.get("product_id") == product_id:
+        if distributor_id:
+            inv = aws.manager(DistributorInventoryManager).get_item(
+                {"id": f"{distributor_id}#{product_id}"}
+            )
+            if inv:
                 stock = int(inv.get("quantity", 0))
 
         return JsonResponse({
@@ -792,15 +886,35 @@ class CustomerOrderDetailsView(View):
 
 class CustomerOrderHistoryView(View):
     def get(self, request):
-        orders = CustomerOrderHistoryService().list_all()
-        distributors = {d["id"]: d.get("name", "") for d in DistributorManager().scan()}
-        products = {p.get("finished_id"): p.get("blend_name", "") for p in FinishedProductManager().scan()}
+        page = CustomerOrderHistoryService().list_page(
+            request.GET.get("cursor"), request.GET.get("page_size")
+        )
+        orders = page.items
+        distributors, products = gather(
+            Call(reference_cache.names, "Distributors", default={}),
+            Call(reference_cache.names, "FinishedProducts", default={}),
+        )
 
         for o in orders:
             o.distributor_name = distributors.get(getattr(o, "distributor_id", ""), o.distributor_name or "-")
             o.product_name = products.get(getattr(o, "product_id", ""), o.product_name or "-")
 
-        return render(request, "supplyapp/customer_order_history.html", {"orders": orders})
+        return render(request, "supplyapp/customer_order_history.html", {"orders": orders, "page": page})
+
+
+class RequestTimingsView(View):
+    """Recent per-request timing breakdowns (staff only unless REQUEST_TIMINGS_VIEW_PUBLIC)."""
+
+    def get(self, request):
+        if not (request.user.is_staff or getattr(settings, "REQUEST_TIMINGS_VIEW_PUBLIC", False)):
+            return JsonResponse({"error": "Not found"}, status=404)
+        timings = recent_timings.snapshot()
+        path = request.GET.get("path")
+        if path:
+            timings = [t for t in timings if t["path"].startswith(path)]
+        if request.GET.get("sort") == "slowest":
+            timings.sort(key=lambda t: t["total_ms"], reverse=True)
+        return JsonResponse({"timings": timings})
 
 
 class ShipmentTrackingView(View):
@@ -815,13 +929,6 @@ class ShipmentTrackingView(View):
         new_status = request.POST.get('status')
         tracking_no = request.POST.get('tracking_no')
 
-        # Update order details
-        order.tracking_link = tracking_no
-        order.update_status_and_inventory(new_status)
-
-        # Send customer notification using SNSManager
-        sns = SNSManager(topic_arn=settings.AWS_SNS_TOPIC_ARN)
-
         message = (
             f"Order Update:\n"
             f"Order ID: {order.order_id}\n"
@@ -832,10 +939,20 @@ class ShipmentTrackingView(View):
             f"Tracking No: {tracking_no or 'Not Assigned'}\n"
         )
 
-        sns.publish_message(
-            subject="Order Status Update",
-            message=message
-        )
+        # Status change and notification commit together; drain_outbox
+        # publishes the message to SNS outside the request.
+        try:
+            with transaction.atomic():
+                order.tracking_link = tracking_no
+                order.update_status_and_inventory(new_status)
+                enqueue_notification(subject="Order Status Update", message=message)
+        except InsufficientStockError as exc:
+            messages.error(request, f"Cannot update shipment: {exc}")
+            return redirect("customer_order_history")
+        except (ClientError, BotoCoreError) as exc:
+            print(f"Error updating shipment for order {order.order_id}: {exc}")
+            messages.error(request, "Cannot update shipment: inventory could not be updated. Please try again.")
+            return redirect("customer_order_history")
 
         messages.success(request, "Shipment updated and customer notified.")
         return redirect("customer_order_history")
@@ -846,7 +963,13 @@ class ChangeCustomerOrderStatusView(View):
     def post(self, request, order_id):
         new_status = request.POST.get("status")
         order = get_object_or_404(CustomerOrderHistory, order_id=order_id)
-        order.update_status_and_inventory(new_status)
+        try:
+            order.update_status_and_inventory(new_status)
+        except InsufficientStockError as exc:
+            messages.error(request, f"Cannot update order: {exc}")
+        except (ClientError, BotoCoreError) as exc:
+            print(f"Error updating order {order_id}: {exc}")
+            messages.error(request, "Cannot update order: inventory could not be updated. Please try again.")
         return redirect("customer_order_history")
         
         sns = SNSManager(topic_arn=settings.AWS_SNS_TOPIC_ARN)
@@ -863,6 +986,59 @@ class ChangeCustomerOrderStatusView(View):
         )
 
 
+class BulkOrderStatusView(View):
+    """
+    Change the status of many orders at once.
+
+    POST ``order_ids`` (repeated field, comma separated, or a JSON body
+    ``{"order_ids": [...], "status": "..."}``) to
+    ``orders/<purchase|distributor|customer>/bulk-status/``.
+    """
+
+    handlers = {
+        "purchase": BulkOrderStatusService.update_purchase_orders,
+        "distributor": BulkOrderStatusService.update_distributor_orders,
+        "customer": BulkOrderStatusService.update_customer_orders,
+    }
+
+    def post(self, request, kind):
+        handler = self.handlers.get(kind)
+        if handler is None:
+            return JsonResponse({"error": f"Unknown order type: {kind}"}, status=404)
+
+        if request.content_type == "application/json":
+            try:
+                payload = json.loads(request.body or b"{}")
+            except ValueError:
+                return JsonResponse({"error": "Invalid JSON body."}, status=400)
+            if not isinstance(payload, dict):
+                return JsonResponse({"error": "Expected a JSON object."}, status=400)
+            order_ids = payload.get("order_ids") or []
+            new_status = payload.get("status")
+            if not isinstance(order_ids, list) or not all(isinstance(i, (str, int)) for i in order_ids):
+                return JsonResponse({"error": "order_ids must be a list of order IDs."}, status=400)
+            if new_status is not None and not isinstance(new_status, str):
+                return JsonResponse({"error": "status must be a string."}, status=400)
+        else:
+            order_ids = [i for v in request.POST.getlist("order_ids") for i in v.split(",")]
+            new_status = request.POST.get("status")
+
+        order_ids = [str(i).strip() for i in order_ids if str(i).strip()]
+        if not order_ids or not new_status:
+            return JsonResponse({"error": "order_ids and status are required."}, status=400)
+
+        try:
+            updated = handler(BulkOrderStatusService(), order_ids, new_status)
+        except InsufficientStockError as exc:
+            return JsonResponse({"error": str(exc)}, status=409)
+        except ValueError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+        except (ClientError, BotoCoreError) as exc:
+            print(f"Error applying bulk status update: {exc}")
+            return JsonResponse({"error": "Inventory could not be updated. Please try again."}, status=503)
+        return JsonResponse({"requested": len(order_ids), "updated": updated, "status": new_status})
+
+
 class CognitoUserAuth:
     """Shared Cognito service instance for auth views."""
 
@@ -892,14 +1068,12 @@ class SignupView(CognitoUserAuth, View):
             messages.error(request, "Passwords do not match.")
             return render(request, self.template_name)
 
-        # Check if user already exists in Cognito
-        if self.cognito.user_exists(email):
-            messages.error(request, "Account already exists. Please log in.")
-            return redirect("login")
-
-        # Sign up user in Cognito
+        # Sign up user in Cognito; an existing account comes back as an error
         signup_result = self.cognito.sign_up(email, password)
         print("DEBUG SIGNUP RESULT:", signup_result)
+        if signup_result.get("code") == "UsernameExistsException":
+            messages.error(request, "Account already exists. Please log in.")
+            return redirect("login")
         if "error" in signup_result:
             messages.error(request, signup_result["error"])
             return render(request, self.template_name)
@@ -933,23 +1107,22 @@ class LoginView(CognitoUserAuth, View):
             messages.error(request, "Email and password are required.")
             return render(request, self.template_name)
 
-        # Check if the user exists before authenticating
-        if not self.cognito.user_exists(email):
+        # One Cognito round trip; an unknown user comes back as an error
+        login_result = self.cognito.login(email, password)
+        if login_result.get("code") == "UserNotFoundException":
             messages.error(request, "Account does not exist. Please sign up first.")
             return redirect("signup")
-
-        login_result = self.cognito.login(email, password)
         if "error" in login_result:
             messages.error(request, login_result["error"])
             return render(request, self.template_name)
 
-        tokens = login_result.get("tokens", {})
-        request.session["access_token"] = tokens.get("AccessToken")
-        request.session["id_token"] = tokens.get("IdToken")
-        request.session["refresh_token"] = tokens.get("RefreshToken")
-        request.session["user_email"] = email
-        request.session.modified = True
-        print("DEBUG LOGIN: session after save:", dict(request.session))
+        # Tokens are verified locally against the cached JWKS
+        try:
+            store_tokens(request.session, login_result.get("tokens", {}), email)
+        except InvalidToken as e:
+            print(f"Rejected Cognito token at login: {e}")
+            messages.error(request, "Login failed. Please try again.")
+            return render(request, self.template_name)
 
         return redirect("customer_order_form")  # Replace with your actual URL name
 